@@ -0,0 +1,55 @@
+from argparse import ArgumentParser
+from env.chessboard import ChessBoard
+from env.constants import SEARCH, STATE, STORE
+from env.game import Game
+from env.notation import read_positions
+from env.players import Computer, Player
+from env.store import AnalysisStore
+from json import dumps
+from sys import stdout
+from time import perf_counter
+
+
+def analyze(path: str, depth: int, seconds: float, nodes: int | None=None, store: AnalysisStore=None) -> object:
+    """Search every position of an EPD or PGN file in turn, and lazily yield each result.
+
+    Positions already in the store, searched deep enough, are answered from it without searching.
+    """
+
+    game = Game()
+    computer = Computer(seconds=seconds, nodes=nodes, store=store)  # Its table carries over between positions
+    for fen, details in read_positions(path):
+        board = ChessBoard(fen=fen)
+        computer.team = board.turn
+        start = perf_counter()
+        move = computer.ab_search(game, STATE(board, computer, Player(near=board.turn != 'white'), depth), 0)
+        horizon, value, _ = computer.results[-1] if computer.results else (0, None, None)
+        result = {'fen': fen, **details, 'move': None, 'san': None, 'value': value, 'depth': horizon,
+                  'nodes': computer.nodes, 'seconds': round(perf_counter() - start, 3)}
+        if move is not None:
+            result['move'], result['san'] = board.movetotext(move), board.movetosan(move)
+            if expected := details.get('bm'):  # Best moves of a test suite
+                result['solved'] = result['san'].rstrip('+#') in {san.rstrip('+#') for san in expected.split()}
+        yield result
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Search every position of an EPD or PGN file, streaming JSON lines.")
+    parser.add_argument('path', help="EPD file, or PGN file (every position before each move)")
+    parser.add_argument('--depth', type=int, default=SEARCH['depth'], help="deepest iteration per position")
+    parser.add_argument('--seconds', type=float, default=SEARCH['seconds'], help="time budget per position")
+    parser.add_argument('--nodes', type=int, default=SEARCH['nodes'], help="node budget per position")
+    parser.add_argument('--output', help="file to write to, instead of standard output")
+    parser.add_argument('--store', nargs='?', const=STORE['path'], help="database of past analysis to reuse and extend")
+    args = parser.parse_args()
+    out = open(args.output, 'w') if args.output else stdout
+    store = AnalysisStore(args.store) if args.store else None
+    try:
+        for result in analyze(args.path, args.depth, args.seconds, args.nodes, store):
+            out.write(dumps(result) + '\n')
+            out.flush()  # Each result is available as soon as it is found
+    finally:
+        if out is not stdout:
+            out.close()
+        if store is not None:
+            store.close()
@@ -0,0 +1,30 @@
+from argparse import ArgumentParser
+from env.book import Book, build
+from env.chessboard import ChessBoard
+from env.constants import BOOK
+from env.notation import START
+from time import perf_counter
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Build an opening book from a PGN file, or list a position's book moves.")
+    parser.add_argument('mode', choices=('build', 'probe'))
+    parser.add_argument('path', nargs='?', default=BOOK['path'], help="book file, built by this engine")
+    parser.add_argument('--pgn', help="games to build from (build)")
+    parser.add_argument('--plies', type=int, default=BOOK['plies'], help="opening plies of each game (build)")
+    parser.add_argument('--minimum', type=int, default=BOOK['minimum'], help="times a move was played (build)")
+    parser.add_argument('--fen', default=START, help="position to list (probe)")
+    args = parser.parse_args()
+    if args.mode == 'build':
+        if args.pgn is None:
+            parser.error("build needs --pgn")
+        start = perf_counter()
+        entries = build(args.pgn, args.path, args.plies, args.minimum)
+        print(f"{entries} entries in {perf_counter() - start:.2f}s")
+    else:
+        book, board = Book(args.path), ChessBoard(fen=args.fen)
+        start = perf_counter()
+        moves = book.moves(board)
+        elapsed = perf_counter() - start
+        for move, weight in sorted(moves, key=lambda entry: -entry[1]):
+            print(f"{board.movetosan(move):<8} {weight}")
+        print(f"{len(moves)} moves of {len(book)} entries in {elapsed * 1e6:.0f}us")
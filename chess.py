@@ -1,7 +1,18 @@
+from argparse import ArgumentParser
+from env.constants import STORE
 from env.game import Game
+from env.players import Computer
+from env.store import AnalysisStore
 
 if __name__ == '__main__':
-    game = Game()
+    parser = ArgumentParser(description="Play chess against the computer.")
+    parser.add_argument('--fen', help="position to start from, in Forsyth-Edwards Notation")
+    parser.add_argument('--store', nargs='?', const=STORE['path'], help="database of past analysis to reuse and extend")
+    args = parser.parse_args()
+    store = AnalysisStore(args.store) if args.store else None
+    game = Game(p2=Computer(store=store), fen=args.fen)
     winner = game.play()
     print(f"{winner} wins.")
     game.report()
+    if store is not None:
+        store.close()
@@ -0,0 +1,83 @@
+from env.bitboard import lsb, msb
+from env.constants import META
+
+WIDTH = META['width']
+
+DIRECTIONS = {  # (rank step, file step) of each ray
+    'north': (+1, +0),
+    'northeast': (+1, +1),
+    'east': (+0, +1),
+    'southeast': (-1, +1),
+    'south': (-1, +0),
+    'southwest': (-1, -1),
+    'west': (+0, -1),
+    'northwest': (+1, -1)}
+
+ORTHOGONALS = ('north', 'east', 'south', 'west')
+DIAGONALS = ('northeast', 'southeast', 'southwest', 'northwest')
+ASCENDING = {'north', 'northeast', 'east', 'northwest'}  # Rays along which the square index grows
+
+
+def walk(square: int, rank_step: int, file_step: int, limit: int=WIDTH) -> object:
+    """Yield the squares stepped onto from a square, until the edge of the board or a step limit."""
+
+    rank, file = divmod(square, WIDTH)
+    for _ in range(limit):
+        rank, file = rank + rank_step, file + file_step
+        if not (0 <= rank < WIDTH and 0 <= file < WIDTH):
+            return
+        yield rank * WIDTH + file
+
+
+def table(steps: tuple, limit: int) -> list[int]:
+    """Build the bitboard of squares reached from each square by a set of steps."""
+    return [sum(1 << dest for step in steps for dest in walk(square, *step, limit=limit))
+            for square in range(WIDTH ** 2)]
+
+
+KNIGHT = table(((+1, +2), (+2, +1), (+2, -1), (+1, -2), (-1, -2), (-2, -1), (-2, +1), (-1, +2)), limit=1)
+KING = table(tuple(DIRECTIONS.values()), limit=1)
+PAWN = {  # Squares attacked by a pawn of each team
+    'white': table(((+1, -1), (+1, +1)), limit=1),
+    'black': table(((-1, -1), (-1, +1)), limit=1)}
+RAYS = {  # Squares along each ray from each square, up to the edge of the board
+    direction: table((step,), limit=WIDTH) for direction, step in DIRECTIONS.items()}
+
+
+def ray_attacks(square: int, occupancy: int, direction: str) -> int:
+    """Return the squares attacked along a ray, up to and including its first blocker."""
+
+    ray = RAYS[direction][square]
+    if blockers := ray & occupancy:
+        blocker = lsb(blockers) if direction in ASCENDING else msb(blockers)
+        ray ^= RAYS[direction][blocker]
+    return ray
+
+
+def rook_attacks(square: int, occupancy: int) -> int:
+    """Return the squares attacked by a rook on a square."""
+    return (ray_attacks(square, occupancy, 'north') | ray_attacks(square, occupancy, 'east')
+            | ray_attacks(square, occupancy, 'south') | ray_attacks(square, occupancy, 'west'))
+
+
+def bishop_attacks(square: int, occupancy: int) -> int:
+    """Return the squares attacked by a bishop on a square."""
+    return (ray_attacks(square, occupancy, 'northeast') | ray_attacks(square, occupancy, 'southeast')
+            | ray_attacks(square, occupancy, 'southwest') | ray_attacks(square, occupancy, 'northwest'))
+
+
+def queen_attacks(square: int, occupancy: int) -> int:
+    """Return the squares attacked by a queen on a square."""
+    return rook_attacks(square, occupancy) | bishop_attacks(square, occupancy)
+
+
+def between(src: int, dest: int) -> int:
+    """Return the squares strictly between two squares on a shared rank, file, or diagonal."""
+
+    for rays in RAYS.values():
+        if rays[src] >> dest & 1:
+            return rays[src] & ~rays[dest] & ~(1 << dest)
+    return 0
+
+
+BETWEEN = [[between(src, dest) for dest in range(WIDTH ** 2)] for src in range(WIDTH ** 2)]
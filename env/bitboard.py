@@ -0,0 +1,22 @@
+def squares(bitboard: int) -> object:
+    """Yield the index of every set bit in a bitboard, from least to most significant."""
+
+    while bitboard:
+        lsb = bitboard & -bitboard
+        yield lsb.bit_length() - 1
+        bitboard ^= lsb
+
+
+def lsb(bitboard: int) -> int:
+    """Return the index of the least significant set bit in a bitboard."""
+    return (bitboard & -bitboard).bit_length() - 1
+
+
+def msb(bitboard: int) -> int:
+    """Return the index of the most significant set bit in a bitboard."""
+    return bitboard.bit_length() - 1
+
+
+def popcount(bitboard: int) -> int:
+    """Return the number of set bits in a bitboard."""
+    return bitboard.bit_count()
@@ -0,0 +1,109 @@
+from collections import Counter
+from env.chessboard import ChessBoard
+from env.constants import BOOK, CASTLING
+from env.notation import START, read_pgn
+from mmap import ACCESS_READ, mmap
+from random import Random
+from struct import Struct
+
+ENTRY = Struct('>QHHI')  # Book entry: this engine's Zobrist key, move, weight, learn
+KEY = Struct('>Q')
+PROMOTIONS = (None, 'Knight', 'Bishop', 'Rook', 'Queen')  # Promotion codes of a book move
+
+
+def encode(board: ChessBoard, move: tuple[int, int, str | None]) -> int:
+    """Pack a move into a book move, where castling is written as the king taking its own rook."""
+
+    src, dest, promotion = move
+    if board.squares[src].name == 'King':
+        for _, king, king_dest, rook, _ in CASTLING.values():
+            if src == king and dest == king_dest:
+                dest = rook
+    return PROMOTIONS.index(promotion) << 12 | src << 6 | dest
+
+
+def decode(board: ChessBoard, raw: int) -> tuple[int, int, str | None]:
+    """Unpack a book move on a board."""
+
+    src, dest, promotion = raw >> 6 & 63, raw & 63, PROMOTIONS[raw >> 12 & 7]
+    if (piece := board.squares[src]) is not None and piece.name == 'King':
+        for _, king, king_dest, rook, _ in CASTLING.values():
+            if src == king and dest == rook:
+                dest = king_dest
+    return src, dest, promotion
+
+
+class Book:
+    """An opening book of 16-byte entries sorted by key, memory-mapped and binary searched.
+
+    The file is mapped read-only, so every process probing the same book shares its pages,
+    and nothing is read until a lookup touches it. Entries are laid out as in Polyglot books, but keyed by
+    this engine's Zobrist keys, so only books built by `build` match.
+    """
+
+    def __init__(self, path: str=BOOK['path'], seed: int=None) -> None:
+        """Map a book file."""
+
+        with open(path, 'rb') as file:
+            self.map = mmap(file.fileno(), 0, access=ACCESS_READ) if file.seek(0, 2) else b''
+        self.size = len(self.map) // ENTRY.size
+        self.random = Random(seed)
+
+    def close(self) -> None:
+        """Unmap the book file."""
+
+        if self.map:
+            self.map.close()
+
+    def __len__(self) -> int:
+        """Return the number of entries."""
+        return self.size
+
+    def entries(self, key: int) -> object:
+        """Yield the (move, weight, learn) of each entry of a key."""
+
+        low, high = 0, self.size
+        while low < high:  # First entry not below the key
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.map, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else: high = middle
+        while low < self.size and (entry := ENTRY.unpack_from(self.map, low * ENTRY.size))[0] == key:
+            yield entry[1:]
+            low += 1
+
+    def moves(self, board: ChessBoard) -> list[tuple[tuple, int]]:
+        """Return the legal book moves of a board, with their weights."""
+
+        legal = board.legal_moves()
+        return [(move, weight) for raw, weight, _ in self.entries(board.key)
+                if weight and (move := decode(board, raw)) in legal]
+
+    def choose(self, board: ChessBoard) -> tuple[int, int, str | None] | None:
+        """Pick a book move for a board at random, in proportion to its weight, if it has any."""
+
+        if not (moves := self.moves(board)):
+            return None
+        return self.random.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def build(games: str, path: str, plies: int=BOOK['plies'], minimum: int=BOOK['minimum']) -> int:
+    """Write a book of the moves played in the opening plies of a PGN file's games, and return its entries.
+
+    Each move is weighted by how often it was played, and kept only if it was played `minimum` times.
+    """
+
+    counts = Counter()
+    for tags, moves in read_pgn(games):
+        try: board = ChessBoard(fen=tags.get('FEN', START))
+        except ValueError: continue  # A game from an unreadable position is skipped
+        for san in moves[:plies]:
+            try: move = board.santomove(san)
+            except ValueError: break
+            counts[board.key, encode(board, move)] += 1
+            board.make_move(move)
+    entries = sorted((key, raw, min(count, 0xFFFF)) for (key, raw), count in counts.items() if count >= minimum)
+    with open(path, 'wb') as file:
+        for key, raw, weight in entries:
+            file.write(ENTRY.pack(key, raw, weight, 0))
+    return len(entries)
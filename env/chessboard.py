@@ -1,14 +1,23 @@
-from env.constants import META
-from env.metaclass.board import Board
-from env.pieces import PIECE_SETS
-from env.players import *
+from env.bitboard import squares
+from env.constants import BITBOARD, CASTLING, CASTLING_MASKS, LETTERS, META, RIVALS
+from env.evaluation import PHASES, TABLES
+from env.movegen import in_check, legal_moves
+from env.pieces import PIECES
+from env.players import Player
+from env.zobrist import KEYS, zobrist
+from re import fullmatch
 
+PROMOTIONS = {piece.__name__: piece for piece in PIECES}  # Chesspiece types by name
 
-class ChessBoard(metaclass=Board):
-    """An arbitrary chessboard with reference to its players."""
 
-    board = [
-        [None for _ in range(META['width'])] for _ in range(META['width'])]
+class ChessBoard:
+    """An arbitrary chessboard with reference to its players.
+
+    Every board holds its own position, in slots, so any number of games can share a process.
+    """
+
+    __slots__ = ('p1', 'p2', 'squares', 'bitboards', 'occupancy', 'turn', 'castling', 'en_passant', 'halfmove',
+                 'fullmove', 'history', 'key', 'pawn_key', 'mg', 'eg', 'phase', 'watchers', 'moves', '__weakref__')
 
     @staticmethod
     def filetoidx(file: str) -> int:
@@ -24,97 +33,396 @@ class ChessBoard(metaclass=Board):
         rank_index = META['ranks'].index(rank)
         return rank_index
 
-    def __init__(self, p1: Player=TEAMS['player'], p2: Computer=TEAMS['computer']) -> None:
-        """Assign players to the chessboard and arrange their chesspieces."""
+    @staticmethod
+    def tosquare(ords: tuple[int, int] | int) -> int:
+        """Convert a coordinate to its square index in `[0, 63]`."""
+
+        if isinstance(ords, int):  # Already a square
+            return ords
+        rank, file = ords
+        return rank * META['width'] + file
+
+    @staticmethod
+    def toords(square: int) -> tuple[int, int]:
+        """Convert a square index in `[0, 63]` to its coordinate."""
+        return divmod(square, META['width'])
+
+    @staticmethod
+    def texttomove(text: str) -> tuple[int, int, str | None]:
+        """Convert a move written as `e2e4`, `e2 e4`, or `e7e8q` to its squares and promotion."""
+
+        text = text.replace(' ', '').lower()
+        if len(text) not in (4, 5) or text[0] not in META['files'] or text[2] not in META['files'] \
+                or not text[1].isdigit() or not text[3].isdigit():
+            raise ValueError(f"Cannot read the move {text!r}.")
+        src, dest = (META['files'].index(text[i]) + META['width'] * (int(text[i + 1]) - 1) for i in (0, 2))
+        names = {letter: name for name, letter in LETTERS.items() if name not in ('Pawn', 'King')}
+        promotion = names.get(text[4:]) if text[4:] else None
+        if not (0 <= src < 64 and 0 <= dest < 64) or text[4:] and promotion is None:
+            raise ValueError(f"Cannot read the move {text!r}.")
+        return src, dest, promotion
+
+    @staticmethod
+    def movetotext(move: tuple[int, int, str | None]) -> str:
+        """Convert a move to its text, such as `e2e4` or `e7e8q`."""
+
+        src, dest, promotion = move
+        text = ''.join(META['files'][square % META['width']] + str(square // META['width'] + 1)
+                       for square in (src, dest))
+        return text + LETTERS[promotion] if promotion else text
+
+    def __init__(self, p1: Player=None, p2: Player=None, fen: str=None) -> None:
+        """Assign players to the chessboard and arrange the starting position, or a FEN position."""
 
         self.p1 = p1
         self.p2 = p2
-        white_set = self.p1.piece_set
-        black_set = self.p2.piece_set
-        for piece in white_set + black_set:
-            self.set(piece.ords, piece)
+        self.squares = [None] * META['width'] ** 2  # Chesspiece on each square
+        self.bitboards = {  # One bitboard per team and piece type
+            team: {piece.__name__: BITBOARD['empty'] for piece in PIECES}
+            for team in META['teams']}
+        self.occupancy = {  # One bitboard per team
+            team: BITBOARD['empty'] for team in META['teams']}
+        self.turn = 'white'  # Team to move
+        self.en_passant = None  # Square skipped by a double pawn push
+        self.halfmove = 0  # Plies since the last capture or pawn move
+        self.fullmove = 1  # Moves since the start of the game
+        self.history = []  # Undo records of the moves made
+        self.key = 0  # Zobrist key, updated incrementally
+        self.pawn_key = 0  # Zobrist key of the pawns alone, for the pawn-structure cache
+        self.mg = self.eg = 0  # Middlegame and endgame material and piece-square scores, from white's view
+        self.phase = 0  # Game phase, from 0 (bare kings and pawns) up to 24 (every chesspiece)
+        self.watchers = []  # Incremental evaluators told of every chesspiece set and lifted
+        self.moves = None, None  # Legal moves of the last position generated, with its key
+        self.load(META['start'] if fen is None else fen)
+
+    def load(self, fen: str) -> None:
+        """Arrange the chessboard from a position in Forsyth-Edwards Notation."""
+
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(fields) < 4 or len(rows) != META['width'] or fields[1] not in ('w', 'b'):
+            raise ValueError(f"Cannot read the FEN {fen!r}.")
+        placement, turn, castling, en_passant, *clocks = fields
+        names = {letter: name for name, letter in LETTERS.items()}
+        for square in range(META['width'] ** 2):
+            self.set(None, square)
+        for rank, row in zip(reversed(range(META['width'])), rows):
+            file = 0
+            for letter in row:
+                if letter.isdigit():
+                    file += int(letter)
+                    continue
+                if letter.lower() not in names or file >= META['width']:
+                    raise ValueError(f"Cannot read the FEN {fen!r}.")
+                team = 'white' if letter.isupper() else 'black'
+                piece = PROMOTIONS[names[letter.lower()]](team=team)
+                if piece.name == 'Pawn':  # A pawn off its starting rank has opened
+                    piece.active = rank != (1 if team == 'white' else 6)
+                self.set(piece, rank * META['width'] + file)
+                file += 1
+        self.turn = 'white' if turn == 'w' else 'black'
+        self.castling = sum(CASTLING[right][0] for right in castling if right in CASTLING)
+        self.en_passant = None if en_passant == '-' else \
+            self.tosquare(self.ordstoidx((en_passant[0], en_passant[1])))
+        self.halfmove, self.fullmove = (int(clocks[0]), int(clocks[1])) if len(clocks) >= 2 else (0, 1)
+        self.history = []
+        self.moves = None, None
+        self.key = zobrist(self)
+
+    def fen(self) -> str:
+        """Return the position in Forsyth-Edwards Notation."""
+
+        rows = []
+        for rank in reversed(range(META['width'])):
+            row, empty = '', 0
+            for piece in self.squares[rank * META['width']:(rank + 1) * META['width']]:
+                if piece is None:
+                    empty += 1
+                    continue
+                letter = LETTERS[piece.name]
+                row += (str(empty) if empty else '') + (letter.upper() if piece.team == 'white' else letter)
+                empty = 0
+            rows.append(row + (str(empty) if empty else ''))
+        castling = ''.join(right for right, (flag, *_) in CASTLING.items() if self.castling & flag) or '-'
+        en_passant = '-' if self.en_passant is None else self.movetotext((self.en_passant, self.en_passant, None))[:2]
+        return f"{'/'.join(rows)} {self.turn[0]} {castling} {en_passant} {self.halfmove} {self.fullmove}"
+
+    def movetosan(self, move: tuple[int, int, str | None]) -> str:
+        """Convert a legal move to Standard Algebraic Notation, such as `Nbd7`, `exd6`, `e8=Q+`, or `O-O`."""
+
+        src, dest, promotion = move
+        piece = self.squares[src]
+        text = self.movetotext(move)
+        if piece.name == 'King' and abs(dest - src) == 2:
+            san = 'O-O' if dest > src else 'O-O-O'
+        else:
+            capture = self.squares[dest] is not None or piece.name == 'Pawn' and dest == self.en_passant
+            if piece.name == 'Pawn':
+                san = (text[0] + 'x' if capture else '') + text[2:4]
+            else:
+                width = META['width']
+                rivals = [other for other, to, _ in self.legal_moves()  # Others of its type reaching dest
+                          if other != src and to == dest and self.squares[other].name == piece.name]
+                hint = '' if not rivals else text[0] if all(other % width != src % width for other in rivals) \
+                    else text[1] if all(other // width != src // width for other in rivals) else text[:2]
+                san = LETTERS[piece.name].upper() + hint + ('x' if capture else '') + text[2:4]
+            if promotion is not None:
+                san += '=' + LETTERS[promotion].upper()
+        self.make_move(move)
+        if self.in_check():
+            san += '#' if not self.legal_moves() else '+'
+        self.unmake_move()
+        return san
+
+    def santomove(self, san: str) -> tuple[int, int, str | None]:
+        """Convert a move in Standard Algebraic Notation to the legal move it names."""
 
-    def __str__(cls) -> None:
-        """Print a graphical representation of the chessboard to the terminal."""
+        text = san.rstrip('+#!?')
+        if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+            king = 4 if self.turn == 'white' else 60
+            matches = [move for move in self.legal_moves()
+                       if move[0] == king and move[1] == king + (2 if len(text) == 3 else -2)
+                       and self.squares[king].name == 'King']
+        elif parts := fullmatch(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?', text):
+            letter, file, rank, dest, promotion = parts.groups()
+            names = {letter.upper(): name for name, letter in LETTERS.items()}
+            name = names[letter or 'P']
+            dest = META['files'].index(dest[0]) + META['width'] * (int(dest[1]) - 1)
+            matches = [move for move in self.legal_moves()
+                       if move[1] == dest and self.squares[move[0]].name == name
+                       and (file is None or META['files'][move[0] % META['width']] == file)
+                       and (rank is None or move[0] // META['width'] + 1 == int(rank))
+                       and move[2] == (names[promotion] if promotion else None)]
+        else: matches = []
+        if len(matches) != 1:
+            raise ValueError(f"Cannot read the move {san!r} in {self.fen()!r}.")
+        return matches[0]
+
+    def __str__(self) -> str:
+        """Return a graphical representation of the chessboard."""
 
         FILE_GAP, INDENT = 3, 5
         DOT, PIPE, SPACE, NEWLINE, NULL = \
             '.', '|', ' ', '\n', ''
         PADDED_DOT = SPACE + DOT + SPACE
         PADDED_PIPE = SPACE + PIPE + SPACE
-        for rank, row in enumerate(cls.board):
-            print(rank + 1, end=PADDED_PIPE)
-            for piece in row:
-                print(PADDED_DOT if piece is None else piece, end=SPACE)
-            print(NEWLINE)
-        print(str(SPACE for _ in range(INDENT)), end=NULL)
-        for file in META.files.upper():
-            print(file + SPACE * FILE_GAP, end=NULL)
-
-    def ordstoidx(cls, ords: tuple[str, int | str]) -> tuple[int, int]:
+        lines = []
+        for rank in reversed(range(META['width'])):  # Eighth rank on top
+            row = self.squares[rank * META['width']:(rank + 1) * META['width']]
+            lines.append(str(rank + 1) + PADDED_PIPE + SPACE.join(
+                PADDED_DOT if piece is None else repr(piece) for piece in row) + NEWLINE)
+        lines.append(SPACE * INDENT + NULL.join(
+            file.upper() + SPACE * FILE_GAP for file in META['files']))
+        return NEWLINE.join(lines)
+
+    def ordstoidx(self, ords: tuple[str, int | str]) -> tuple[int, int]:
         """Convert a coordinate on the chessboard to its corresponding indices."""
 
         file, rank = ords
         file, rank = file.lower(), int(rank)
-        indices = cls.ranktoidx(rank), cls.filetoidx(file)
+        indices = self.ranktoidx(rank), self.filetoidx(file)
         return indices
 
-    def get(cls, ords: tuple[int, int]) -> object:
+    def get(self, ords: tuple[int, int] | int) -> object:
         """Get the object occupied at a coordinate."""
+        return self.squares[self.tosquare(ords)]
 
-        rank, file = ords
-        return cls.board[rank][file]
+    def set(self, piece: object, ords: tuple[int, int] | int) -> None:
+        """Set an object at a coordinate, keeping the keys and evaluation scores up to date."""
 
-    def set(cls, piece: object, ords: tuple[int, int]) -> None:
-        """Set an object at a coordinate."""
-
-        rank, file = ords
-        cls.board[rank][file] = piece
-        piece.ords = ords
+        square = self.tosquare(ords)
+        bit = 1 << square
+        if (occupant := self.squares[square]) is not None:  # Lift the occupant off its bitboards
+            team, name = occupant.team, occupant.name
+            self.bitboards[team][name] ^= bit
+            self.occupancy[team] ^= bit
+            self.key ^= KEYS['pieces'][team][name][square]
+            if name == 'Pawn':
+                self.pawn_key ^= KEYS['pieces'][team][name][square]
+            mg, eg = TABLES[team][name][square]
+            self.mg, self.eg, self.phase = self.mg - mg, self.eg - eg, self.phase - PHASES[name]
+            for watcher in self.watchers:
+                watcher.lift(self, team, name, square)
+        self.squares[square] = piece
+        if piece is not None:
+            team, name = piece.team, piece.name
+            self.bitboards[team][name] |= bit
+            self.occupancy[team] |= bit
+            self.key ^= KEYS['pieces'][team][name][square]
+            if name == 'Pawn':
+                self.pawn_key ^= KEYS['pieces'][team][name][square]
+            mg, eg = TABLES[team][name][square]
+            self.mg, self.eg, self.phase = self.mg + mg, self.eg + eg, self.phase + PHASES[name]
+            for watcher in self.watchers:
+                watcher.place(self, team, name, square)
+            piece.ords = self.toords(square)
 
-    def move(cls, src: tuple[int, int], dest: tuple[int, int]) -> object:
+    def move(self, src: tuple[int, int] | int, dest: tuple[int, int] | int) -> object:
         """Move a chesspiece from one coordinate to another."""
 
-        src_piece = cls.get(src)
-        dest_piece = cls.get(dest)
-        cls.set(src_piece, dest)
-        cls.set(None, src)
+        src_piece = self.get(src)
+        dest_piece = self.get(dest)
+        self.set(None, src)
+        self.set(src_piece, dest)
         return dest_piece
 
-    def occupied(cls, ords: tuple[int, int]) -> bool:
+    def make_move(self, move: tuple[int, int, str | None]) -> object:
+        """Make a move in place, recording how to unmake it, and return the captured chesspiece.
+
+        The Zobrist key follows every change: pieces through `set`, and turn, castling rights,
+        and en passant here.
+        """
+
+        if move is None:  # Null move, which only passes the turn
+            return self.make_null()
+        src, dest, promotion = move
+        piece = self.squares[src]
+        captured, behind = self.squares[dest], dest
+        if piece.name == 'Pawn' and dest == self.en_passant:  # En passant captures the pawn behind
+            behind = dest - 8 if piece.team == 'white' else dest + 8
+            captured = self.squares[behind]
+        self.history.append(  # Undo record
+            (move, piece, captured, getattr(piece, 'active', None),
+             self.castling, self.en_passant, self.halfmove, self.key))
+        self.halfmove = 0 if piece.name == 'Pawn' or captured is not None else self.halfmove + 1
+        if self.en_passant is not None:
+            self.key ^= KEYS['en_passant'][self.en_passant % META['width']]
+        self.en_passant = None
+        if piece.name == 'Pawn':
+            piece.active = True
+            if behind != dest:
+                self.set(None, behind)
+            elif abs(dest - src) == 16:  # Double push
+                self.en_passant = (src + dest) // 2
+                self.key ^= KEYS['en_passant'][self.en_passant % META['width']]
+        elif piece.name == 'King' and abs(dest - src) == 2:  # Castling also moves the rook
+            for _, king, king_dest, rook, rook_dest in CASTLING.values():
+                if src == king and dest == king_dest:
+                    self.move(rook, rook_dest)
+        self.move(src, dest)
+        if promotion is not None:
+            self.set(PROMOTIONS[promotion](team=piece.team), dest)
+        self.key ^= KEYS['castling'][self.castling]
+        self.castling &= CASTLING_MASKS[src] & CASTLING_MASKS[dest]
+        self.key ^= KEYS['castling'][self.castling] ^ KEYS['turn']
+        if self.turn == 'black':
+            self.fullmove += 1
+        self.turn = RIVALS[self.turn]
+        return captured
+
+    def make_null(self) -> None:
+        """Pass the turn without moving, recording how to unmake it."""
+
+        self.history.append((None, None, None, None, self.castling, self.en_passant, self.halfmove, self.key))
+        if self.en_passant is not None:
+            self.key ^= KEYS['en_passant'][self.en_passant % META['width']]
+            self.en_passant = None
+        self.key ^= KEYS['turn']
+        self.halfmove += 1
+        if self.turn == 'black':
+            self.fullmove += 1
+        self.turn = RIVALS[self.turn]
+
+    def unmake_move(self) -> tuple[int, int, str | None] | None:
+        """Unmake the last move (or null move) made, and return it."""
+
+        move, piece, captured, active, castling, en_passant, halfmove, key = self.history.pop()
+        self.turn = RIVALS[self.turn]
+        if self.turn == 'black':
+            self.fullmove -= 1
+        if move is None:  # Null move
+            self.en_passant, self.halfmove, self.key = en_passant, halfmove, key
+            return move
+        src, dest, _ = move
+        self.set(None, dest)
+        self.set(piece, src)
+        if piece.name == 'Pawn':
+            piece.active = active
+            if dest == en_passant:  # Restore the pawn taken en passant
+                self.set(captured, dest - 8 if piece.team == 'white' else dest + 8)
+                captured = None
+        elif piece.name == 'King' and abs(dest - src) == 2:  # Return the castled rook
+            for _, king, king_dest, rook, rook_dest in CASTLING.values():
+                if src == king and dest == king_dest:
+                    self.move(rook_dest, rook)
+        if captured is not None:
+            self.set(captured, dest)
+        self.castling = castling
+        self.en_passant = en_passant
+        self.halfmove = halfmove
+        self.key = key
+        return move
+
+    def occupied(self, ords: tuple[int, int] | int) -> bool:
         """Determine whether or not a coordinate is occupied."""
 
-        occupant = cls.get(ords)
-        occupied = bool(occupant)
+        occupancy = self.occupancy['white'] | self.occupancy['black']
+        occupied = bool(occupancy >> self.tosquare(ords) & 1)
         return occupied
 
-    def valid(cls, move: tuple[tuple[int, int], tuple[int, int]], player: Player) -> bool:
+    def count(self, team: str, name: str) -> int:
+        """Count the chesspieces of a type that a team has on the board."""
+        return self.bitboards[team][name].bit_count()
+
+    def legal_moves(self) -> list[tuple[int, int, str | None]]:
+        """Return the legal moves of the team to move, generated once per position."""
+
+        key, moves = self.moves
+        if key != self.key:
+            moves = legal_moves(self)
+            self.moves = self.key, moves
+        return moves
+
+    def captures(self) -> list[tuple[int, int, str | None]]:
+        """Return the legal captures and promotions of the team to move."""
+
+        key, moves = self.moves
+        if key == self.key:  # Already generated every legal move
+            return [move for move in moves if self.squares[move[1]] is not None or move[2] is not None
+                    or move[1] == self.en_passant and self.squares[move[0]].name == 'Pawn']
+        return legal_moves(self, captures_only=True)
+
+    def in_check(self, team: str=None) -> bool:
+        """Determine whether or not a team (the team to move, by default) is in check."""
+        return in_check(self, team)
+
+    def in_checkmate(self) -> bool:
+        """Determine whether or not the team to move is checkmated."""
+        return not self.legal_moves() and self.in_check()
+
+    def in_stalemate(self) -> bool:
+        """Determine whether or not the team to move is stalemated."""
+        return not self.legal_moves() and not self.in_check()
+
+    def valid(self, move: tuple, player: Player) -> bool:
         """Validate an arbitrary movement on the board."""
 
         valid = False
-        src, dest = move
-        piece = cls.get(src)
-        if src not in META['ords'] or dest not in META['ords']:  # Out-of-bounds
+        src, dest = move[:2]
+        inside = lambda ords: 0 <= ords < META['width'] ** 2 if isinstance(ords, int) \
+            else all(0 <= i < META['width'] for i in ords)
+        if not (inside(src) and inside(dest)):  # Out-of-bounds
             raise ValueError("Cannot move outside the board.")
-        if src is dest:  # Same position
+        if self.tosquare(src) == self.tosquare(dest):  # Same position
             raise ValueError("Cannot move to the same position.")
+        piece = self.get(src)
         if piece is None:  # Empty source
             raise ValueError("Cannot move from an empty position.")
-        if piece.team is not player.team:  # Opponent's pieces
+        if piece.team != player.team:  # Opponent's pieces
             raise ValueError("Cannot move an opposing piece.")
-        if piece.valid(move, player):  # Validate piece
+        if piece.valid(move, self):  # Validate piece
             valid = True
         return valid
 
-    def neighborhood(cls, center: tuple[int, int], proxim: int=1) -> object:
+    def neighborhood(self, center: tuple[int, int] | int, proxim: int=1) -> object:
         """Yield the neighbors around a center within a given proximity."""
 
-        ords_idx = map(cls.ordstoidx, META['ords'])
-        pieces = filter(cls.occupied, ords_idx)
-        center_file, center_rank = center
-        for piece in pieces:
-            file, rank = piece.ords
-            file_dist = abs(ord(file) - ord(center_file))
-            rank_dist = abs(int(rank) - int(center_rank))
-            if max(file_dist, rank_dist) <= proxim:
-                yield piece
+        rank, file = self.toords(self.tosquare(center))
+        files = ranks = BITBOARD['empty']
+        for i in range(max(0, file - proxim), min(META['width'], file + proxim + 1)):
+            files |= BITBOARD['files'][i]
+        for i in range(max(0, rank - proxim), min(META['width'], rank + proxim + 1)):
+            ranks |= BITBOARD['ranks'][i]
+        occupancy = self.occupancy['white'] | self.occupancy['black']
+        for square in squares(files & ranks & occupancy):
+            yield self.squares[square]
@@ -2,9 +2,136 @@ from collections import namedtuple
 
 META = {  # Chessboard metadata
     'width': 8,
+    'teams': ('white', 'black'),
     'ranks': (ranks := [*range(1, 9)]),  # [1, 2, ... 8]
     'files': (files := [chr(i) for i in range(97, 105)]),  # ['a', 'b', ... 'h']
-    'ords': [(rank, file) for rank in ranks for file in files]}  # [(1, 'a'), (1, 'b'), ... (8, 'f')]
+    'ords': [(rank, file) for rank in ranks for file in files],  # [(1, 'a'), (1, 'b'), ... (8, 'f')]
+    'start': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'}  # Standard starting position, in FEN
+
+LETTERS = {  # Letter of each chesspiece type, in lowercase
+    'Pawn': 'p',
+    'Rook': 'r',
+    'Knight': 'n',
+    'Bishop': 'b',
+    'Queen': 'q',
+    'King': 'k'}
+
+RIVALS = {  # Opposing team of each team
+    'white': 'black',
+    'black': 'white'}
+
+BITBOARD = {  # Bitboard metadata, where square = 8 * rank index + file index
+    'empty': 0,
+    'full': (1 << 64) - 1,
+    'files': [0x0101010101010101 << i for i in range(8)],  # [a-file, b-file, ... h-file]
+    'ranks': [0xFF << 8 * i for i in range(8)]}  # [1st rank, 2nd rank, ... 8th rank]
+
+CASTLING = {  # Castling rights: (flag, king square, king destination, rook square, rook destination)
+    'K': (1, 4, 6, 7, 5),
+    'Q': (2, 4, 2, 0, 3),
+    'k': (4, 60, 62, 63, 61),
+    'q': (8, 60, 58, 56, 59)}
+
+CASTLING_MASKS = [  # Castling rights kept after a move touches each square
+    15 & ~sum(flag for flag, king, _, rook, _ in CASTLING.values() if square in (king, rook))
+    for square in range(64)]
+
+TRANSPOSITION = {  # Transposition table defaults
+    'megabytes': 16,  # Memory budget
+    'ways': 4,  # Entries per bucket
+    'policy': 'depth'}  # Bucket eviction policy, 'depth' (depth-preferred) or 'always' (always-replace)
+
+SEARCH = {  # Search defaults
+    'depth': 64,  # Deepest iteration
+    'seconds': 5.0,  # Time budget per move
+    'nodes': None,  # Node budget per move, if any
+    'interval': 16,  # Nodes between clock checks
+    'window': 25,  # Aspiration half-window, in centipawns
+    'delta': 200,  # Delta pruning margin, in centipawns
+    'mate': 100_000,  # Score of checkmate, less the plies it takes
+    'pvs': True,  # Principal variation search
+    'null_move': True,  # Null-move pruning
+    'null_reduction': 2,  # Plies a null move's search is reduced by
+    'lmr': True,  # Late move reductions
+    'lmr_moves': 3,  # Moves searched in full before reducing
+    'lmr_draft': 3,  # Plies left below which moves are not reduced
+    'batch': False,  # Evaluate the leaves below each frontier node together, in one matrix product
+    'ponder': True}  # Search the predicted reply on the player's time
+
+EVALUATION = {  # Evaluation defaults
+    'phase': 24,  # Game phase of the starting position, where the middlegame score counts in full
+    'pawn_entries': 1 << 14,  # Pawn-structure cache entries
+    'weights': 'weights.npz'}  # Tuned weights, loaded at startup instead of the hand-set tables when present
+
+NNUE = {  # Neural network evaluation defaults
+    'path': 'network.npz',  # Weights file
+    'hidden': 128,  # First layer units per perspective
+    'activation': 255,  # Upper clip of the first layer's units, the quantization scale of its weights
+    'output': 64,  # Quantization scale of the output layer's weights
+    'scale': 400}  # Centipawns per unit of network output
+
+BOOK = {  # Opening book defaults
+    'path': 'book.bin',  # Book file
+    'plies': 16,  # Opening plies of each game added by the builder
+    'minimum': 2}  # Times a move must have been played to be added
+
+TUNER = {  # Evaluation tuner defaults
+    'chunk': 10_000,  # Lines or games each worker process extracts at once
+    'workers': None,  # Extraction processes, or one per core
+    'epochs': 20,  # Passes over every position
+    'batch': 16_384,  # Positions in each gradient step
+    'rate': 1.0,  # Adam step size, in centipawns
+    'scale': None}  # Sigmoid scale, or fitted to the data first
+
+STORE = {  # Persistent analysis defaults
+    'path': 'analysis.db',  # SQLite database file
+    'entries': 1_000_000,  # Positions kept, beyond which the shallowest are evicted
+    'depth': 8,  # Plies a search must reach to be written back, and a stored result to be played without searching
+    'timeout': 5.0}  # Seconds to wait for another process's write lock
+
+TABLEBASE = {  # Endgame tablebase defaults
+    'directory': 'tablebases',  # Directory of the tablebase files
+    'suffix': '.tb',  # Extension of a tablebase file, after its signature
+    'signatures': ('KQK', 'KRK', 'KPK', 'KBNK'),  # Endings generated by default, smaller ones first
+    'pieces': 4,  # Most chesspieces in any ending probed
+    'workers': None}  # Worker processes that generate, or one per core
+
+CLOCK = {  # Time control defaults
+    'moves': 30,  # Moves assumed left in the game when the time control does not say
+    'increment': 0.75,  # Share of the increment spent on each move
+    'reserve': 0.5,  # Largest share of the time left spent on one move
+    'overhead': 0.05}  # Seconds set aside per move for communication
+
+UCI = {  # Universal Chess Interface defaults
+    'name': 'chess',  # Engine name reported to the interface
+    'author': 'Ben'}  # Engine author reported to the interface
+
+TOURNAMENT = {  # Self-play tournament defaults
+    'games': 1000,  # Games to play, in pairs with the colors reversed, unless the SPRT stops earlier
+    'seconds': 10.0,  # Base time of each side's clock
+    'increment': 0.1,  # Seconds added to a side's clock after each of its moves
+    'plies': 400,  # Plies after which a game is drawn
+    'random_plies': 8,  # Random plies of each opening, when there is no opening suite
+    'elo0': 0.0,  # Elo difference of the SPRT's null hypothesis
+    'elo1': 5.0,  # Elo difference of the SPRT's alternative hypothesis
+    'alpha': 0.05,  # SPRT false positive rate
+    'beta': 0.05,  # SPRT false negative rate
+    'megabytes': 16}  # Transposition table of each engine
+
+SERVER = {  # Game server defaults
+    'host': '127.0.0.1',  # Address to listen on, local only
+    'port': 7878,  # Port to listen on
+    'workers': None,  # Search processes, or one per core
+    'pending': 256,  # Searches queued at once, beyond which clients wait before sending more
+    'sessions': 100_000,  # Games open at once
+    'seconds': 60.0,  # Base time of the computer's clock in each game
+    'increment': 1.0,  # Seconds added to the computer's clock after each of its moves
+    'megabytes': 16,  # Transposition table of each search process
+    'samples': 10_000}  # Recent reply latencies kept for percentiles
+
+PARALLEL = {  # Parallel search defaults
+    'workers': None,  # Worker processes, or one per core
+    'margin': 0.05}  # Seconds of the time budget set aside for starting and collecting workers
 
 STATE = namedtuple(  # Game state
     typename='state',
@@ -0,0 +1,243 @@
+from env.attacks import RAYS
+from env.bitboard import squares
+from env.constants import BITBOARD, EVALUATION, LETTERS, META
+from numpy import array, load as read, minimum, zeros
+from os import path as paths
+
+WIDTH = META['width']
+
+MATERIAL = {  # (middlegame, endgame) value of each chesspiece type, in centipawns
+    'Pawn': (100, 120),
+    'Knight': (320, 300),
+    'Bishop': (330, 320),
+    'Rook': (500, 520),
+    'Queen': (900, 920),
+    'King': (0, 0)}
+
+PHASES = {  # Contribution of each chesspiece type to the game phase, which is 24 at the start
+    'Pawn': 0,
+    'Knight': 1,
+    'Bishop': 1,
+    'Rook': 2,
+    'Queen': 4,
+    'King': 0}
+
+PIECE_SQUARES = {  # (middlegame, endgame) bonus of each square for white, drawn with the eighth rank on top
+    'Pawn': ((0, 0, 0, 0, 0, 0, 0, 0,
+              50, 50, 50, 50, 50, 50, 50, 50,
+              10, 10, 20, 30, 30, 20, 10, 10,
+              5, 5, 10, 25, 25, 10, 5, 5,
+              0, 0, 0, 20, 20, 0, 0, 0,
+              5, -5, -10, 0, 0, -10, -5, 5,
+              5, 10, 10, -20, -20, 10, 10, 5,
+              0, 0, 0, 0, 0, 0, 0, 0),
+             (0, 0, 0, 0, 0, 0, 0, 0,
+              80, 80, 80, 80, 80, 80, 80, 80,
+              50, 50, 50, 50, 50, 50, 50, 50,
+              30, 30, 30, 30, 30, 30, 30, 30,
+              15, 15, 15, 15, 15, 15, 15, 15,
+              5, 5, 5, 5, 5, 5, 5, 5,
+              0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0)),
+    'Knight': ((-50, -40, -30, -30, -30, -30, -40, -50,
+                -40, -20, 0, 0, 0, 0, -20, -40,
+                -30, 0, 10, 15, 15, 10, 0, -30,
+                -30, 5, 15, 20, 20, 15, 5, -30,
+                -30, 0, 15, 20, 20, 15, 0, -30,
+                -30, 5, 10, 15, 15, 10, 5, -30,
+                -40, -20, 0, 5, 5, 0, -20, -40,
+                -50, -40, -30, -30, -30, -30, -40, -50),) * 2,
+    'Bishop': ((-20, -10, -10, -10, -10, -10, -10, -20,
+                -10, 0, 0, 0, 0, 0, 0, -10,
+                -10, 0, 5, 10, 10, 5, 0, -10,
+                -10, 5, 5, 10, 10, 5, 5, -10,
+                -10, 0, 10, 10, 10, 10, 0, -10,
+                -10, 10, 10, 10, 10, 10, 10, -10,
+                -10, 5, 0, 0, 0, 0, 5, -10,
+                -20, -10, -10, -10, -10, -10, -10, -20),) * 2,
+    'Rook': ((0, 0, 0, 0, 0, 0, 0, 0,
+              5, 10, 10, 10, 10, 10, 10, 5,
+              -5, 0, 0, 0, 0, 0, 0, -5,
+              -5, 0, 0, 0, 0, 0, 0, -5,
+              -5, 0, 0, 0, 0, 0, 0, -5,
+              -5, 0, 0, 0, 0, 0, 0, -5,
+              -5, 0, 0, 0, 0, 0, 0, -5,
+              0, 0, 0, 5, 5, 0, 0, 0),) * 2,
+    'Queen': ((-20, -10, -10, -5, -5, -10, -10, -20,
+               -10, 0, 0, 0, 0, 0, 0, -10,
+               -10, 0, 5, 5, 5, 5, 0, -10,
+               -5, 0, 5, 5, 5, 5, 0, -5,
+               0, 0, 5, 5, 5, 5, 0, -5,
+               -10, 5, 5, 5, 5, 5, 0, -10,
+               -10, 0, 5, 0, 0, 0, 0, -10,
+               -20, -10, -10, -5, -5, -10, -10, -20),) * 2,
+    'King': ((-30, -40, -40, -50, -50, -40, -40, -30,
+              -30, -40, -40, -50, -50, -40, -40, -30,
+              -30, -40, -40, -50, -50, -40, -40, -30,
+              -30, -40, -40, -50, -50, -40, -40, -30,
+              -20, -30, -30, -40, -40, -30, -30, -20,
+              -10, -20, -20, -20, -20, -20, -20, -10,
+              20, 20, 0, 0, 0, 0, 20, 20,
+              20, 30, 10, 0, 0, 10, 30, 20),
+             (-50, -40, -30, -20, -20, -30, -40, -50,
+              -30, -20, -10, 0, 0, -10, -20, -30,
+              -30, -10, 20, 30, 30, 20, -10, -30,
+              -30, -10, 30, 40, 40, 30, -10, -30,
+              -30, -10, 30, 40, 40, 30, -10, -30,
+              -30, -10, 20, 30, 30, 20, -10, -30,
+              -30, -30, 0, 0, 0, 0, -30, -30,
+              -50, -30, -30, -30, -30, -30, -30, -50))}
+
+PAWN_TERMS = {  # (middlegame, endgame) pawn-structure terms
+    'doubled': (-10, -20),  # Per pawn beyond the first on a file
+    'isolated': (-10, -15),  # Per pawn without friendly pawns on neighboring files
+    'passed': ((0, 0), (5, 10), (10, 20), (15, 35), (25, 60), (40, 90), (60, 130), (0, 0))}  # By rank advanced
+
+
+def load(path: str=EVALUATION['weights']) -> dict | None:
+    """Read the weights written by the tuner, if there are any.
+
+    They are `middlegame` and `endgame` piece-square scores including material, of shape (6, 64),
+    for white's chesspieces in the order of PIECE_SQUARES, and `pawns` terms of shape (10, 2),
+    in the order of `pawn_counts`.
+    """
+
+    if not paths.exists(path):
+        return None
+    with read(path) as weights:
+        return {key: weights[key].round().astype(int).tolist() for key in ('middlegame', 'endgame', 'pawns')}
+
+
+def tables(tuned: dict=None) -> dict:
+    """Build the signed (middlegame, endgame) score of each team's chesspieces on each square, from white's view.
+
+    Scores come from tuned weights if given, or else from the material and piece-square tables above.
+    """
+
+    built = {}
+    for team, sign in (('white', +1), ('black', -1)):
+        built[team] = {}
+        for i, (name, (middlegame, endgame)) in enumerate(PIECE_SQUARES.items()):
+            material_mg, material_eg = MATERIAL[name]
+            built[team][name] = []
+            for square in range(WIDTH ** 2):
+                rank, file = divmod(square, WIDTH)
+                if tuned is not None:
+                    own = square if team == 'white' else (WIDTH - 1 - rank) * WIDTH + file  # As seen by white
+                    built[team][name].append((sign * tuned['middlegame'][i][own], sign * tuned['endgame'][i][own]))
+                    continue
+                seen = (WIDTH - 1 - rank if team == 'white' else rank) * WIDTH + file  # Row as drawn
+                built[team][name].append((sign * (material_mg + middlegame[seen]),
+                                          sign * (material_eg + endgame[seen])))
+    return built
+
+
+if (TUNED := load()) is not None:  # Tuned pawn-structure terms replace the hand-set ones
+    PAWN_TERMS = {'doubled': tuple(TUNED['pawns'][0]), 'isolated': tuple(TUNED['pawns'][1]),
+                  'passed': tuple(map(tuple, TUNED['pawns'][2:]))}
+TABLES = tables(TUNED)  # Added to a board's scores as chesspieces are set, and subtracted as they are lifted
+
+PLANES = [(team, name) for team in META['teams'] for name in LETTERS]  # 12 piece-square feature planes
+FEATURES = len(PLANES) * WIDTH ** 2
+WEIGHTS = array([  # (middlegame, endgame, phase) weight of each feature, for batched evaluation
+    (*TABLES[team][name][square], PHASES[name]) for team, name in PLANES for square in range(WIDTH ** 2)],
+    dtype=float)
+
+ADJACENT_FILES = [  # Files beside each file
+    (BITBOARD['files'][file - 1] if file > 0 else 0) | (BITBOARD['files'][file + 1] if file < WIDTH - 1 else 0)
+    for file in range(WIDTH)]
+FRONT_SPANS = {  # Squares ahead of each square, on its file and the files beside it
+    'white': [RAYS['north'][square] | (RAYS['north'][square - 1] if square % WIDTH else 0)
+              | (RAYS['north'][square + 1] if square % WIDTH < WIDTH - 1 else 0) for square in range(WIDTH ** 2)],
+    'black': [RAYS['south'][square] | (RAYS['south'][square - 1] if square % WIDTH else 0)
+              | (RAYS['south'][square + 1] if square % WIDTH < WIDTH - 1 else 0) for square in range(WIDTH ** 2)]}
+
+
+class PawnTable:
+    """A fixed-size cache of pawn-structure scores, keyed by the Zobrist key of the pawns alone."""
+
+    def __init__(self, entries: int=EVALUATION['pawn_entries']) -> None:
+        """Allocate the cache's entries."""
+
+        self.size = entries
+        self.entries = [None] * entries  # (pawn key, middlegame, endgame)
+
+    def probe(self, board: object) -> tuple[int, int]:
+        """Return the (middlegame, endgame) pawn-structure score of a board, from white's view."""
+
+        key = board.pawn_key
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2]
+        middlegame, endgame = structure(board)
+        self.entries[key % self.size] = key, middlegame, endgame  # Always replace
+        return middlegame, endgame
+
+
+def pawn_counts(bitboards: dict) -> list[int]:
+    """Count each pawn-structure term, white's less black's: doubled, isolated, then passed pawns by rank advanced."""
+
+    counts = [0] * (2 + WIDTH)
+    for team, sign in (('white', +1), ('black', -1)):
+        pawns = bitboards[team]['Pawn']
+        rivals = bitboards['black' if team == 'white' else 'white']['Pawn']
+        for file in range(WIDTH):
+            if (count := (pawns & BITBOARD['files'][file]).bit_count()) > 1:
+                counts[0] += sign * (count - 1)
+        for square in squares(pawns):
+            if not pawns & ADJACENT_FILES[square % WIDTH]:
+                counts[1] += sign
+            if not rivals & FRONT_SPANS[team][square]:
+                counts[2 + (square // WIDTH if team == 'white' else WIDTH - 1 - square // WIDTH)] += sign
+    return counts
+
+
+def structure(board: object) -> tuple[int, int]:
+    """Score the doubled, isolated, and passed pawns of a board, from white's view."""
+
+    terms = (PAWN_TERMS['doubled'], PAWN_TERMS['isolated'], *PAWN_TERMS['passed'])
+    counts = pawn_counts(board.bitboards)
+    return (sum(count * mg for count, (mg, _) in zip(counts, terms)),
+            sum(count * eg for count, (_, eg) in zip(counts, terms)))
+
+
+class Evaluator:
+    """A tapered evaluation of material, piece-square, and pawn-structure scores."""
+
+    def __init__(self, pawn_entries: int=EVALUATION['pawn_entries']) -> None:
+        """Initialize the pawn-structure cache."""
+        self.pawns = PawnTable(pawn_entries)
+
+    def evaluate(self, board: object, team: str) -> int:
+        """Evaluate a board for a team, blending its middlegame and endgame scores by the game phase.
+
+        Material and piece-square scores are kept up to date by the board as chesspieces are set,
+        so only the pawn structure may need computing, and then only once per pawn arrangement.
+        """
+
+        pawns_mg, pawns_eg = self.pawns.probe(board)
+        phase = min(board.phase, EVALUATION['phase'])
+        score = ((board.mg + pawns_mg) * phase
+                 + (board.eg + pawns_eg) * (EVALUATION['phase'] - phase)) // EVALUATION['phase']
+        return score if team == 'white' else -score
+
+    def encode(self, board: object) -> tuple[list[int], int, int]:
+        """Encode a board as the indices of its active piece-square features, and its pawn-structure score."""
+
+        active = [plane * WIDTH ** 2 + square
+                  for plane, (team, name) in enumerate(PLANES) for square in squares(board.bitboards[team][name])]
+        return active, *self.pawns.probe(board)
+
+    def evaluate_batch(self, encoded: list[tuple], team: str) -> list[int]:
+        """Evaluate a batch of encoded boards for a team, with one matrix product over their feature planes."""
+
+        planes = zeros((len(encoded), FEATURES))
+        pawns = zeros((len(encoded), 2))
+        for row, (active, pawns_mg, pawns_eg) in enumerate(encoded):
+            planes[row, active] = 1
+            pawns[row] = pawns_mg, pawns_eg
+        middlegame, endgame, phase = (planes @ WEIGHTS).T
+        phase = minimum(phase, EVALUATION['phase'])
+        scores = ((middlegame + pawns[:, 0]) * phase
+                  + (endgame + pawns[:, 1]) * (EVALUATION['phase'] - phase)) // EVALUATION['phase']
+        return [int(score) if team == 'white' else -int(score) for score in scores]
@@ -1,99 +1,168 @@
-from copy import deepcopy
 from env.chessboard import ChessBoard
-from env.constants import STATE
-from env.pieces import PIECES, PIECE_SETS
+from env.constants import SEARCH, STATE
+from env.evaluation import Evaluator
 from env.players import *
+from math import inf
+from threading import Thread
+from time import monotonic
 
 
 class Game:
     """A human-versus-computer game of chess."""
 
-    def __init__(self, p1: Player=TEAMS['player'], p2: Computer=TEAMS['computer']) -> None:
-        """Initialize the players and chessboard."""
+    def __init__(self, p1: Player=None, p2: Computer=None, fen: str=None, ponder: bool=SEARCH['ponder'],
+                 evaluator: Evaluator=None) -> None:
+        """Initialize the players, chessboard, and evaluation, from the starting arrangement or a FEN position.
 
-        self.p1 = p1  # Player 1
-        self.p2 = p2  # Player 2 (Computer)
-        self.p1.piece_set = PIECE_SETS['white']
-        self.p2.piece_set = PIECE_SETS['black']
-        self.board = ChessBoard()
+        Chesspieces, the board, and the pieces captured belong to the game alone, so players (such as a Computer
+        with a large table) and an evaluator, whose pawn-structure cache is keyed by position, may be shared.
+        """
+
+        self.p1 = p1 if p1 is not None else Player(near=True)  # Player 1
+        self.p2 = p2 if p2 is not None else Computer(near=False)  # Player 2 (Computer)
+        self.board = ChessBoard(self.p1, self.p2, fen=fen)  # Its own chesspieces, not the players'
+        self.pieces_won = {self.p1.team: [], self.p2.team: []}  # Chesspieces each team captured in this game
+        self.evaluator = evaluator or Evaluator()  # Tapered evaluation, with its own pawn-structure cache
+        self.ponder = ponder  # Search on the player's time
+        self.pondering = None  # (predicted move, thread, reply found, time started) of a background search
 
     def play(self) -> Player | None:
         """Play an entire game of chess."""
 
-        player = self.p1
-        game_over = False
+        player, opponent = (self.p1, self.p2) if self.board.turn == self.p1.team else (self.p2, self.p1)
+        self.winner = None
+        game_over, reply = False, None
         while not game_over:  # Game loop
             print(self.board)  # Show board state
+            state = STATE(  # Game state, searched in place
+                board=self.board,
+                player=player,
+                opponent=opponent,
+                depth=SEARCH['depth'])  # Deepened until the time budget runs out
             if player is self.p1:  # Player turn
+                if self.ponder:
+                    self.start_pondering()
                 valid_move = False
                 while not valid_move:  # Enforce legal moves
-                    move = input("Move: ").split()
-                    if player.valid(move, self.board):
+                    try: move = self.board.texttomove(input("Move: "))
+                    except ValueError: move = None
+                    if move in self.actions(state):
                         valid_move = True
-                        player.claim(move, self.board)
+                        self.claim(player, move)
                     else: print("Illegal move.")
+                reply = self.stop_pondering(move)
             else:  # Computer turn
-                move = self.p2.ab_search(  # Alpha-beta search
+                move = reply if reply is not None else self.p2.ab_search(  # Alpha-beta search
                     game=self,
-                    state=STATE(  # Game state
-                        board=deepcopy(self.board),
-                        player=deepcopy(player),  # self.p2
-                        opponent=deepcopy(self.p1),
-                        depth=STATE.depth),
+                    state=state,
                     depth=0)  # Search from root
-                player.claim(move, self.p2)
-            if winner := self.in_check() or self.in_stalemate():
+                self.claim(player, move)
+            player, opponent = opponent, player
+            if self.at_terminal(state := STATE(self.board, player, opponent)):
                 game_over = True
-            player = self.p1 if player is self.p2 else self.p2
-        return winner or None
+                if self.in_checkmate(state):
+                    self.winner = opponent
+        return self.winner
+
+    def claim(self, player: Player, move: tuple[int, int, str | None]) -> object:
+        """Make a player's move on the board, keeping the chesspiece it captures, if any."""
+
+        if captured := self.board.make_move(move):
+            self.pieces_won[player.team].append(captured)
+        return captured
+
+    def start_pondering(self) -> None:
+        """Search the position after the player's predicted move in the background, while they think."""
+
+        line, history = self.p2.line, self.board.history
+        if len(line) < 2 or not history or history[-1][0] != line[0] or line[1] not in self.board.legal_moves():
+            return  # No prediction from the computer's last search
+        board = ChessBoard(self.p1, self.p2, fen=self.board.fen())  # Its own board, searched in place
+        board.make_move(line[1])
+        state = STATE(board=board, player=self.p2, opponent=self.p1, depth=SEARCH['depth'])
+        replies = []
+        thread = Thread(target=lambda: replies.append(self.p2.ab_search(self, state, 0, seconds=inf)), daemon=True)
+        self.pondering = line[1], thread, replies, monotonic()
+        thread.start()
+
+    def stop_pondering(self, move: tuple[int, int, str | None]) -> tuple[int, int, str | None] | None:
+        """End the background search once the player moves, and return its reply if it pondered that move.
+
+        A correct prediction lets the search carry on until its time budget, counted from when pondering
+        started, runs out. Otherwise it is stopped, keeping its transposition table entries.
+        """
+
+        if self.pondering is None:
+            return None
+        predicted, thread, replies, started = self.pondering
+        self.pondering = None
+        while thread.is_alive():
+            if move == predicted:
+                self.p2.limit(started + self.p2.seconds)
+            else: self.p2.stop()
+            thread.join(SEARCH['interval'] / 1000)
+        return replies[0] if move == predicted and replies else None
 
     def actions(self, state: namedtuple) -> set:
         """Return the set of legal actions for the state."""
-        return state.player.get_moves()
-
-    def result(self, state: namedtuple, action: tuple[int, int]) -> namedtuple:
-        """Determine the result of an action on a state."""
-
-        ords = deepcopy(state.ords)
-        player = deepcopy(state.player)
-        opponent = deepcopy(state.opponent)
-        for piece_type in PIECES:
-            player.pieces[piece_type].clear()
-            opponent.pieces[piece_type].clear()
-        state.board.move(action)
-        for ords_ in ords:
-            piece = state.board.get(ords_)
-            if piece is not None:
-                if piece.team == player.team:
-                    player.pieces[piece.name].append(piece)
-                else: opponent.pieces[piece.name].append(piece)
-        return STATE(  # State produced by the action
+        return state.player.get_moves(state.board)
+
+    def captures(self, state: namedtuple) -> list:
+        """Return the legal captures and promotions for the state."""
+        return state.board.captures()
+
+    def result(self, state: namedtuple, action: tuple[int, int, str | None]) -> namedtuple:
+        """Make an action on the state's board, and return the state it produces."""
+
+        state.board.make_move(action)
+        return STATE(  # State produced by the action, with the opponent to move
             board=state.board,
-            player=player,
-            opponent=opponent,
+            player=state.opponent,
+            opponent=state.player,
             depth=state.depth)
 
-    def evaluate(self, state):
-        """Make an evaluation on the current state of the game."""
+    def undo(self, state: namedtuple) -> None:
+        """Unmake the last action made on the state's board."""
+        state.board.unmake_move()
 
-        distance = lambda p: (len(state.player.pieces[p.name]) - len(state.opponent.pieces[p.name]))
-        return sum(piece.WEIGHT * distance(piece) for piece in PIECES.values())
+    def evaluate(self, state: namedtuple) -> int:
+        """Make an evaluation on the current state of the game, from the view of the player to move."""
+        return self.evaluator.evaluate(state.board, state.player.team)
+
+    def evaluate_batch(self, state: namedtuple, actions: list) -> dict[int, int]:
+        """Evaluate every state an action produces at once, by Zobrist key, from the view of the opponent to move."""
+
+        keys, encoded = [], []
+        for action in actions:
+            state.board.make_move(action)
+            keys.append(state.board.key)
+            encoded.append(self.evaluator.encode(state.board))
+            state.board.unmake_move()
+        return dict(zip(keys, self.evaluator.evaluate_batch(encoded, state.opponent.team)))
+
+    def utility(self, state: namedtuple, depth: int) -> int:
+        """Score a state without actions, from the view of the player to move, preferring nearer mates."""
+        return -(SEARCH['mate'] - depth) if self.in_check(state) else 0
 
     def in_check(self, state) -> bool:
-        """Determine whether or not the game is in check."""
-        return state.player.in_check() or state.opponent.in_check()
+        """Determine whether or not the player to move is in check."""
+        return state.board.in_check(state.player.team)
+
+    def in_checkmate(self, state) -> bool:
+        """Determine whether or not the player to move is checkmated."""
+        return state.board.in_checkmate()
 
     def in_stalemate(self, state) -> bool:
         """Determine whether or not the game is in stalemate."""
         return state.board.in_stalemate()
 
-    def at_cutoff(self, state) -> bool:
-        """Determine whether or not the game has reached maximum depth."""
-        return state.depth == STATE.depth
+    def at_cutoff(self, state, depth) -> bool:
+        """Determine whether or not the search has reached the state's maximum depth."""
+        return depth > state.depth
 
     def at_terminal(self, state):
-        """Determine whether or not the game is in a terminal state."""
-        return self.in_check(state) or self.in_stalemate(state)
+        """Determine whether or not the game is in a terminal state, with no legal actions."""
+        return not state.board.legal_moves()
 
     def report(self):
         """Report the game winner."""
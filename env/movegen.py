@@ -0,0 +1,152 @@
+from env.attacks import (BETWEEN, DIAGONALS, KING, KNIGHT, ORTHOGONALS, PAWN, RAYS, ASCENDING,
+                         bishop_attacks, rook_attacks)
+from env.bitboard import lsb, msb, squares
+from env.constants import BITBOARD, CASTLING, RIVALS
+from env.evaluation import MATERIAL
+
+
+def attackers(board: object, square: int, team: str, occupancy: int=None) -> int:
+    """Return the bitboard of a team's chesspieces that attack a square."""
+
+    if occupancy is None:
+        occupancy = board.occupancy['white'] | board.occupancy['black']
+    pieces = board.bitboards[team]
+    return (PAWN[RIVALS[team]][square] & pieces['Pawn']
+            | KNIGHT[square] & pieces['Knight']
+            | KING[square] & pieces['King']
+            | rook_attacks(square, occupancy) & (pieces['Rook'] | pieces['Queen'])
+            | bishop_attacks(square, occupancy) & (pieces['Bishop'] | pieces['Queen']))
+
+
+def attack_map(board: object, team: str, occupancy: int=None) -> int:
+    """Return the bitboard of every square that a team attacks."""
+
+    if occupancy is None:
+        occupancy = board.occupancy['white'] | board.occupancy['black']
+    pieces, attacked = board.bitboards[team], BITBOARD['empty']
+    for square in squares(pieces['Pawn']):
+        attacked |= PAWN[team][square]
+    for square in squares(pieces['Knight']):
+        attacked |= KNIGHT[square]
+    for square in squares(pieces['Bishop'] | pieces['Queen']):
+        attacked |= bishop_attacks(square, occupancy)
+    for square in squares(pieces['Rook'] | pieces['Queen']):
+        attacked |= rook_attacks(square, occupancy)
+    for square in squares(pieces['King']):
+        attacked |= KING[square]
+    return attacked
+
+
+def pins(board: object, team: str, king: int) -> dict[int, int]:
+    """Return the squares that each of a team's pinned chesspieces is confined to, by its square."""
+
+    pinned, rival = {}, board.bitboards[RIVALS[team]]
+    occupancy = board.occupancy['white'] | board.occupancy['black']
+    for directions, sliders in ((ORTHOGONALS, rival['Rook'] | rival['Queen']),
+                                (DIAGONALS, rival['Bishop'] | rival['Queen'])):
+        if not sliders & (RAYS[directions[0]][king] | RAYS[directions[1]][king]
+                          | RAYS[directions[2]][king] | RAYS[directions[3]][king]):
+            continue
+        for direction in directions:
+            blockers = RAYS[direction][king] & occupancy
+            if not blockers:
+                continue
+            nearest = lsb if direction in ASCENDING else msb
+            first = nearest(blockers)
+            if not board.occupancy[team] >> first & 1:  # Not our own piece
+                continue
+            beyond = RAYS[direction][first] & occupancy
+            if beyond and sliders >> (second := nearest(beyond)) & 1:
+                pinned[first] = BETWEEN[king][second] | 1 << second
+    return pinned
+
+
+def in_check(board: object, team: str=None) -> bool:
+    """Determine whether or not a team's king is attacked (the team to move, by default)."""
+
+    team = team or board.turn
+    king = board.bitboards[team]['King']
+    return bool(king) and bool(attackers(board, lsb(king), RIVALS[team]))
+
+
+def legal_moves(board: object, captures_only: bool=False) -> list[tuple[int, int, str | None]]:
+    """Return the legal moves of the team to move, resolving checks and pins without trying each move."""
+
+    team = board.turn
+    rival = RIVALS[team]
+    own, enemy = board.occupancy[team], board.occupancy[rival]
+    occupancy = own | enemy
+    king = lsb(board.bitboards[team]['King'])
+    targets = enemy if captures_only else ~own & BITBOARD['full']
+    danger = attack_map(board, rival, occupancy & ~(1 << king))  # The king cannot hide behind itself
+    moves = [(king, dest, None) for dest in squares(KING[king] & targets & ~danger)]
+    checks = attackers(board, king, rival, occupancy)
+    if checks & checks - 1:  # Double check, so only the king may move
+        return moves
+    evasions = BITBOARD['full'] if not checks else checks | BETWEEN[king][lsb(checks)]
+    pinned = pins(board, team, king)
+    pieces = board.bitboards[team]
+    for square in squares(own & ~pieces['King'] & ~pieces['Pawn']):
+        dests = board.squares[square].attacks(square, occupancy) & targets & evasions
+        if square in pinned:
+            dests &= pinned[square]
+        moves.extend((square, dest, None) for dest in squares(dests))
+    for square in squares(pieces['Pawn']):
+        for move in board.squares[square].moves(board):
+            src, dest, promotion = move
+            if captures_only and not (enemy >> dest & 1 or promotion or dest == board.en_passant):
+                continue
+            if dest == board.en_passant:  # Removes two pawns from one rank, so test it directly
+                behind = dest - 8 if team == 'white' else dest + 8
+                after = occupancy ^ 1 << src ^ 1 << behind | 1 << dest
+                if not attackers(board, king, rival, after) & ~(1 << behind):
+                    moves.append(move)
+                continue
+            if not evasions >> dest & 1 or square in pinned and not pinned[square] >> dest & 1:
+                continue
+            moves.append(move)
+    if not checks and not captures_only:
+        moves.extend(castles(board, team, occupancy, danger))
+    return moves
+
+
+def castles(board: object, team: str, occupancy: int, danger: int) -> object:
+    """Yield a team's castling moves, if neither blocked nor passing through an attacked square."""
+
+    for right, (flag, king, king_dest, rook, _) in CASTLING.items():
+        if board.castling & flag and right.isupper() == (team == 'white'):
+            path = BETWEEN[king][rook]
+            walk = BETWEEN[king][king_dest] | 1 << king_dest
+            if not occupancy & path and not danger & walk:
+                yield king, king_dest, None
+
+
+def exchange(board: object, move: tuple[int, int, str | None]) -> int:
+    """Statically evaluate the material a move wins once every capture on its destination is played out."""
+
+    src, dest, promotion = move
+    occupancy = board.occupancy['white'] | board.occupancy['black']
+    attacker = board.squares[src]
+    victim = board.squares[dest]
+    if victim is None and attacker.name == 'Pawn' and dest == board.en_passant:
+        victim = attacker  # Any pawn weighs the same
+    gains = [0 if victim is None else victim.weight]
+    on_dest, team = attacker.weight, RIVALS[board.turn]
+    if promotion is not None:  # The pawn becomes the promoted chesspiece before anything recaptures it
+        on_dest = MATERIAL[promotion][0]
+        gains[0] += on_dest - attacker.weight
+    occupancy ^= 1 << src
+    while attacks := attackers(board, dest, team, occupancy) & occupancy:
+        least = min(squares(attacks), key=lambda square: board.squares[square].weight)
+        gains.append(on_dest - gains[-1])  # Take whatever stands on the destination
+        if board.squares[least].name == 'King' and attackers(board, dest, RIVALS[team], occupancy ^ 1 << least) \
+                & occupancy:
+            gains.pop()  # The king cannot recapture into a defended square
+            break
+        on_dest = board.squares[least].weight
+        occupancy ^= 1 << least  # Reveals any slider behind it
+        team = RIVALS[team]
+    while len(gains) > 1:  # Either side may stop capturing when it would lose more
+        gain = gains.pop()
+        gains[-1] = -max(-gains[-1], gain)
+    return gains[0]
@@ -0,0 +1,91 @@
+from env.constants import NNUE, RIVALS
+from env.evaluation import FEATURES, PLANES, WIDTH
+from numpy import clip, concatenate, dot, int16, int32, int64, load, random, savez
+from weakref import WeakKeyDictionary
+
+INDICES = {  # Feature index of each team's chesspiece on each square, from each team's perspective
+    perspective: {(team, name): [(PLANES.index((team if perspective == 'white' else RIVALS[team], name)) * WIDTH ** 2
+                                  + (square if perspective == 'white' else square ^ (WIDTH ** 2 - WIDTH)))
+                                 for square in range(WIDTH ** 2)] for team, name in PLANES}
+    for perspective in RIVALS}
+
+
+class Network:
+    """The quantized weights of a small efficiently updatable neural network.
+
+    Each team's perspective has a first layer accumulator of `hidden` units over the 12x64
+    piece-square features, which is clipped and fed, the mover's first, to a single output.
+    """
+
+    def __init__(self, features: object, bias: object, output: object, output_bias: int) -> None:
+        """Hold the first layer's (FEATURES, hidden) weights and bias, and the output layer's weights and bias."""
+
+        if features.shape[0] != FEATURES or output.shape != (2 * features.shape[1],):
+            raise ValueError(f"Cannot use a network of shape {features.shape} and {output.shape}.")
+        self.features = features.astype(int32)
+        self.bias = bias.astype(int32)
+        self.output = output.astype(int64)
+        self.output_bias = int(output_bias)
+
+    @classmethod
+    def load(cls, path: str) -> 'Network':
+        """Load a network's weights from a NumPy archive."""
+
+        with load(path) as weights:
+            return cls(weights['features'], weights['bias'], weights['output'], weights['output_bias'])
+
+    def save(self, path: str) -> None:
+        """Save the network's weights to a NumPy archive."""
+        savez(path, features=self.features.astype(int16), bias=self.bias.astype(int16),
+              output=self.output.astype(int16), output_bias=self.output_bias)
+
+    @classmethod
+    def random(cls, hidden: int=NNUE['hidden'], seed: int=0) -> 'Network':
+        """Return an untrained network of small random weights, of the shape a trained one would have."""
+
+        generator = random.default_rng(seed)
+        return cls(generator.integers(-NNUE['activation'] // 8, NNUE['activation'] // 8, (FEATURES, hidden)),
+                   generator.integers(0, NNUE['activation'] // 2, hidden),
+                   generator.integers(-NNUE['output'], NNUE['output'], 2 * hidden), 0)
+
+
+class NNUEEvaluator:
+    """Evaluates boards with a Network, updating each board's accumulators as its chesspieces are set and lifted."""
+
+    def __init__(self, network: Network | str=NNUE['path']) -> None:
+        """Load a network, from a file unless given one."""
+
+        self.network = network if isinstance(network, Network) else Network.load(network)
+        self.accumulators = WeakKeyDictionary()  # Accumulator of each perspective, for each watched board
+
+    def watch(self, board: object) -> None:
+        """Build a board's accumulators from scratch, and keep them up to date from then on."""
+
+        self.accumulators[board] = {perspective: self.network.bias.copy() for perspective in RIVALS}
+        for square, piece in enumerate(board.squares):
+            if piece is not None:
+                self.place(board, piece.team, piece.name, square)
+        if self not in board.watchers:
+            board.watchers.append(self)
+
+    def place(self, board: object, team: str, name: str, square: int) -> None:
+        """Add a chesspiece's feature columns to a board's accumulators."""
+
+        for perspective, accumulator in self.accumulators[board].items():
+            accumulator += self.network.features[INDICES[perspective][team, name][square]]
+
+    def lift(self, board: object, team: str, name: str, square: int) -> None:
+        """Subtract a chesspiece's feature columns from a board's accumulators."""
+
+        for perspective, accumulator in self.accumulators[board].items():
+            accumulator -= self.network.features[INDICES[perspective][team, name][square]]
+
+    def evaluate(self, board: object, team: str) -> int:
+        """Evaluate a board for a team, watching it first if it is new."""
+
+        if board not in self.accumulators:
+            self.watch(board)
+        accumulators = self.accumulators[board]
+        hidden = clip(concatenate((accumulators[team], accumulators[RIVALS[team]])), 0, NNUE['activation'])
+        return int((dot(hidden, self.network.output) + self.network.output_bias) * NNUE['scale']
+                   // (NNUE['activation'] * NNUE['output']))
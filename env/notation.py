@@ -0,0 +1,89 @@
+from env.chessboard import ChessBoard
+from env.constants import META
+from re import findall, fullmatch, sub
+from textwrap import fill
+
+START = META['start']  # Standard starting position
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')  # Game termination markers
+
+
+def read_epd(path: str) -> object:
+    """Lazily yield the (FEN, operations) of each position in an Extended Position Description file."""
+
+    with open(path) as lines:
+        for line in lines:
+            if not (line := line.strip()) or line.startswith('#'):
+                continue
+            fields = line.split(maxsplit=4)
+            operations = {}
+            for operation in findall(r'\s*([A-Za-z]\w*)\s*((?:"[^"]*"|[^;])*);?', fields[4] if len(fields) > 4 else ''):
+                opcode, operand = operation
+                operations[opcode] = operand.strip().strip('"')
+            clocks = (operations.get('hmvc', '0'), operations.get('fmvn', '1'))
+            yield ' '.join(fields[:4] + list(clocks)), operations
+
+
+def read_pgn(path: str) -> object:
+    """Lazily yield the (tags, moves in Standard Algebraic Notation) of each game in a Portable Game Notation file.
+
+    Comments, variations, numeric annotations, and move numbers are skipped, one line at a time,
+    so files of any size are read in constant memory.
+    """
+
+    tags, moves, nesting, commented = {}, [], 0, False
+    with open(path) as lines:
+        for line in lines:
+            if not commented and not nesting and (tag := fullmatch(r'\s*\[(\w+)\s+"(.*)"\]\s*', line)):
+                if moves:  # A game without a result marker ends at the next game's tags
+                    yield tags, moves
+                    tags, moves = {}, []
+                tags[tag.group(1)] = tag.group(2)
+                continue
+            for token in findall(r'\{|\}|\(|\)|;.*|[^\s{}();]+', line):
+                if commented:
+                    commented = token != '}'
+                elif token == '{':
+                    commented = True
+                elif token == '(' or token == ')':
+                    nesting += 1 if token == '(' else -1
+                elif nesting or token.startswith(';') or token.startswith('$'):
+                    continue
+                elif token in RESULTS:
+                    yield tags, moves
+                    tags, moves = {}, []
+                elif move := sub(r'^\d+\.+', '', token):  # Drop any move number
+                    moves.append(move)
+        if moves:
+            yield tags, moves
+
+
+def read_positions(path: str) -> object:
+    """Lazily yield the (FEN, details) of each position in an EPD file, or before each move of a PGN file's games."""
+
+    if not path.lower().endswith('.pgn'):
+        yield from read_epd(path)
+        return
+    for number, (tags, moves) in enumerate(read_pgn(path), start=1):
+        try: board = ChessBoard(fen=tags.get('FEN', START))
+        except ValueError: continue  # A game from an unreadable position is skipped
+        for ply, san in enumerate(moves, start=1):
+            yield board.fen(), {'id': f"{tags.get('White', '?')} - {tags.get('Black', '?')} #{number}.{ply}",
+                                'played': san}
+            try: board.make_move(board.santomove(san))
+            except ValueError: break  # The rest of an unreadable game is skipped
+
+
+def write_pgn(tags: dict[str, str], moves: list[str], result: str) -> str:
+    """Return a game in Portable Game Notation, from its tags and its moves in Standard Algebraic Notation."""
+
+    fields = tags.get('FEN', START).split()
+    number, white = int(fields[5]) if len(fields) > 5 else 1, fields[1] == 'w'
+    tokens = []
+    for i, san in enumerate(moves):
+        if white or i == 0:
+            tokens.append(f"{number}." if white else f"{number}...")
+        tokens.append(san)
+        number += not white
+        white = not white
+    header = ''.join(f'[{key} "{value}"]\n' for key, value in {**tags, 'Result': result}.items())
+    return f"{header}\n{fill(' '.join(tokens + [result]), width=79)}\n\n"
@@ -0,0 +1,68 @@
+from env.constants import SEARCH
+
+
+class MoveOrderer:
+    """Orders a node's actions in stages: hash move, captures, killer moves, then quiet moves."""
+
+    KILLERS = 2  # Killer moves kept per ply
+
+    def __init__(self, plies: int=SEARCH['depth']) -> None:
+        """Initialize the killer moves of each ply and the history heuristic table."""
+
+        self.plies = plies
+        self.killers = [[None] * self.KILLERS for _ in range(plies + 1)]
+        self.history = {}  # Cutoff score of each (team, src, dest) quiet move
+
+    def age(self) -> None:
+        """Forget the killer moves, and halve the history scores, before a new search."""
+
+        self.killers = [[None] * self.KILLERS for _ in range(self.plies + 1)]
+        self.history = {move: score // 2 for move, score in self.history.items() if score > 1}
+
+    @staticmethod
+    def capture(board: object, action: tuple[int, int, str | None]) -> bool:
+        """Determine whether or not an action captures or promotes."""
+
+        src, dest, promotion = action
+        return board.squares[dest] is not None or promotion is not None or (
+            dest == board.en_passant and board.squares[src].name == 'Pawn')
+
+    @staticmethod
+    def mvv_lva(board: object, action: tuple[int, int, str | None]) -> tuple[int, int]:
+        """Sort key of a capture, by most valuable victim and then least valuable attacker."""
+
+        src, dest, promotion = action
+        attacker, victim = board.squares[src], board.squares[dest]
+        victim_weight = attacker.weight if victim is None and promotion is None else (  # En passant
+            0 if victim is None else victim.weight)
+        return -victim_weight, attacker.weight
+
+    def ordered(self, board: object, actions: set, ply: int, hash_move: tuple=None) -> object:
+        """Lazily yield a node's actions, sorting each stage only once it is reached."""
+
+        if hash_move in actions:
+            yield hash_move
+        captures, quiets = [], []
+        for action in actions:
+            if action != hash_move:
+                (captures if self.capture(board, action) else quiets).append(action)
+        yield from sorted(captures, key=lambda action: self.mvv_lva(board, action))
+        killers = self.killers[min(ply, self.plies)]
+        for killer in killers:
+            if killer is not None and killer in quiets:
+                quiets.remove(killer)
+                yield killer
+        history, team = self.history, board.turn
+        yield from sorted(quiets, key=lambda action: -history.get((team, action[0], action[1]), 0))
+
+    def cutoff(self, board: object, action: tuple[int, int, str | None], ply: int, draft: int) -> None:
+        """Reward a quiet action that caused a beta cutoff, as a killer move and in the history table."""
+
+        if self.capture(board, action):
+            return
+        killers = self.killers[min(ply, self.plies)]
+        if action != killers[0]:
+            killers[1:] = killers[:-1]
+            killers[0] = action
+        move = board.turn, action[0], action[1]
+        self.history[move] = self.history.get(move, 0) + draft * draft
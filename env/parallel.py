@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor
+from env.constants import PARALLEL, SEARCH, TRANSPOSITION
+from env.players import Computer
+from env.workers import initialize, search
+from math import inf
+from multiprocessing import RawArray
+from os import cpu_count
+from time import monotonic
+
+
+class ParallelComputer(Computer):
+    """A computer that splits the root moves of its searches across a pool of worker processes."""
+
+    def __init__(self, near=False, workers=PARALLEL['workers'], megabytes=TRANSPOSITION['megabytes'], **kwargs):
+        """Initialize a Computer, and a pool of worker processes that share root bounds."""
+
+        super().__init__(near=near, megabytes=megabytes, **kwargs)
+        self.workers = workers or cpu_count() or 1
+        self.bounds = RawArray('d', SEARCH['depth'] + 1)  # Best root value of each depth, then a mate at 0
+        self.pool = ProcessPoolExecutor(  # Each worker has its own table of the same size
+            max_workers=self.workers, initializer=initialize, initargs=(megabytes, self.bounds))
+        self.worker_nodes = {}  # Nodes searched for each share of the root moves in the last search
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        self.pool.shutdown()
+
+    def ab_search(self, game, state, depth, seconds=None, nodes=None, moves=None) -> tuple:
+        """Search a game state's root moves in parallel, and return the best move of any share's deepest depth.
+
+        A share that has not completed a depth by the deadline does not hold back the others. Once a share
+        proves a mate, the others stop.
+        """
+
+        seconds = self.seconds if seconds is None else seconds
+        actions = game.actions(state) if moves is None else set(moves) & game.actions(state)
+        if len(actions) <= 1:
+            return next(iter(actions), None)
+        if self.book is not None and moves is None and (move := self.book.choose(state.board)):
+            return move  # A known opening move, without searching
+        for i in range(len(self.bounds)):
+            self.bounds[i] = -inf
+        ordered = list(self.orderer.ordered(state.board, actions, depth + 1, self.pv.get(state.board.key)))
+        shares = [ordered[i::self.workers] for i in range(min(self.workers, len(ordered)))]  # Deal good moves evenly
+        start, fen = monotonic(), state.board.fen()
+        budget = max(0.0, seconds - PARALLEL['margin'])
+        futures = [self.pool.submit(search, fen, state.depth, budget,
+                                    None if nodes is None else nodes // len(shares), share) for share in shares]
+        reports = [future.result() for future in futures]
+        self.worker_nodes = {share: count for share, (_, _, count, _) in enumerate(reports)}
+        self.nodes = sum(self.worker_nodes.values())
+        self.iterations = [(None, self.nodes, monotonic() - start)]
+        candidates = [results[-1] for _, results, _, _ in reports if results and results[-1][2] is not None]
+        if not candidates:  # No worker completed a single depth
+            return ordered[0]
+        # Exact values first, as a fail low only bounds its moves, then the worker that set the shared bound
+        horizon, value, move, exact = max(candidates, key=lambda candidate: (
+            candidate[3], candidate[1], candidate[1] == self.bounds[candidate[0]]))
+        self.results = [(horizon, value, move)]
+        self.pv = {state.board.key: move}
+        return move
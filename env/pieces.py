@@ -1,289 +1,233 @@
-from collections import namedtuple
+from env.attacks import KING, KNIGHT, PAWN, bishop_attacks, queen_attacks, rook_attacks
+from env.bitboard import squares
+from env.constants import BITBOARD
 from env.players import Player
-from itertools import zip_longest
+
+PROMOTABLE = ('Queen', 'Rook', 'Bishop', 'Knight')  # Chesspieces a pawn can promote to
 
 
 class ChessPiece:
-    """An arbitrary chesspiece."""
+    """An arbitrary chesspiece.
+
+    Its name and actions belong to its type, so each chesspiece only holds its team, coordinates,
+    and weight, in slots rather than a dictionary.
+    """
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight: int=1, actions: set=None):
-        """Initialize a chesspiece's name, team, coordinates, weight, and actions."""
+    __slots__ = ('team', 'ords', 'weight')
+    name = 'ChessPiece'
+    actions = frozenset()  # (file, rank) steps
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight: int=1):
+        """Initialize a chesspiece's team, coordinates, and weight (in centipawns)."""
 
-        self.name = self.__class__.__name__
         self.team = team
         self.ords = ords
         self.weight = weight
-        self.actions = actions
 
     def __repr__(self):
         """Return a graphical representation of the piece."""
         return f"{self.team[0].lower()}{self.name[:2]}"
 
-    def valid(self, move: tuple[tuple[int, int], tuple[int, int]], state: namedtuple) -> bool:
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the chesspiece attacks from a square."""
+        return BITBOARD['empty']
+
+    def targets(self, board: object) -> int:
+        """Return the bitboard of squares that the chesspiece can move to, ignoring checks."""
+
+        occupancy = board.occupancy['white'] | board.occupancy['black']
+        return self.attacks(board.tosquare(self.ords), occupancy) & ~board.occupancy[self.team]
+
+    def moves(self, board: object) -> object:
+        """Yield the chesspiece's pseudo-legal moves."""
+
+        src = board.tosquare(self.ords)
+        for dest in squares(self.targets(board)):
+            yield src, dest, None
+
+    def valid(self, move: tuple, board: object) -> bool:
         """Validate a move against an arbitrary chesspiece."""
 
-        valid = False
-        src_piece, dest_piece = map(state.board.get, move)
-        action = map(abs(a - b) for a, b in zip(*move))
-        if src_piece.valid(move, state, action):
-            if dest_piece is not None:
-                if dest_piece.team is not src_piece.team:
-                    valid = True  # Opposing pieces are valid
-                else: raise ValueError(f"You cannot attack your own pieces.")
-            else: valid = True  # Empty spaces are valid
-        return valid
+        dest = board.tosquare(move[1])
+        dest_piece = board.get(dest)
+        if dest_piece is not None and dest_piece.team == self.team:
+            raise ValueError(f"You cannot attack your own pieces.")
+        return bool(self.targets(board) >> dest & 1)
 
 
 class Pawn(ChessPiece):
     """A pawn chesspiece."""
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=3):
+    __slots__ = ('active',)
+    name = 'Pawn'
+    actions = frozenset({
+        (-1, +1),  # Northwest
+        (+0, +1),  # North
+        (+1, +1)})  # Northeast
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=100):
         """Initialize a Pawn's active status and parameters."""
 
         self.active = False
-        super().__init__(
-            team=team,
-            ords=ords,
-            weight=weight,
-            actions={
-                (-1, +1),  # Northwest
-                (+0, +1),  # North
-                (+1, +1)})  # Northeast
-
-    def valid(self, move: tuple[namedtuple, namedtuple], state: namedtuple, action: tuple[int, int]=None) -> bool:
+        super().__init__(team=team, ords=ords, weight=weight)
+
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the Pawn attacks from a square."""
+        return PAWN[self.team][square]
+
+    def moves(self, board: object) -> object:
+        """Yield the Pawn's pseudo-legal pushes, captures, and promotions."""
+
+        src = board.tosquare(self.ords)
+        forward, start, last = (+8, 1, 7) if self.team == 'white' else (-8, 6, 0)
+        occupancy = board.occupancy['white'] | board.occupancy['black']
+        dests = []
+        if not occupancy >> (push := src + forward) & 1:  # Single push
+            dests.append(push)
+            if src // 8 == start and not occupancy >> (push := push + forward) & 1:  # Double push
+                dests.append(push)
+        enemies = occupancy & ~board.occupancy[self.team]
+        if board.en_passant is not None and board.turn == self.team:
+            enemies |= 1 << board.en_passant
+        dests.extend(squares(PAWN[self.team][src] & enemies))
+        for dest in dests:
+            if dest // 8 == last:
+                for promotion in PROMOTABLE:
+                    yield src, dest, promotion
+            else: yield src, dest, None
+
+    def valid(self, move: tuple, board: object) -> bool:
         """Validate a Pawn's move."""
 
-        src, dest = move
-        dest_piece = state.board.get(dest)
-        if self.player.near and src.rank > dest.rank or dest.rank < src.rank:
+        src, dest = map(board.tosquare, move[:2])
+        dest_piece = board.get(dest)
+        action = dest // 8 - src // 8, dest % 8 - src % 8  # Rank and file steps
+        if self.team == 'white' and action[0] < 0 or self.team == 'black' and action[0] > 0:
             raise ValueError("Pawns cannot retreat.")
-        if action == (+0, +1) and dest_piece is not None:
+        if action[1] == 0 and dest_piece is not None:
             raise ValueError("Pawns cannot attack forward.")
-        if action == (+0, +2) and self.active:
+        if abs(action[0]) == 2 and self.active:
             raise ValueError("Pawns cannot repeat this move.")
-        if action == (+1, +1) and dest_piece is None:
+        if action[1] != 0 and dest_piece is None and dest != board.en_passant:
             raise ValueError("Pawns cannot attack an empty space.")
-        if not self.active:  # Once it has opened, a pawn becomes active
-            self.active = True
-        return True
+        return any(dest == d for _, d, _ in self.moves(board))
 
 
 class Rook(ChessPiece):
     """A Rook chesspiece."""
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=8):
+    __slots__ = ()
+    name = 'Rook'
+    actions = frozenset({
+        (-1, +0),  # West
+        (+0, -1),  # South
+        (+0, +1),  # North
+        (+1, +0)})  # East
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=500):
         """Initialize a Rook's parameters."""
 
-        super().__init__(
-            team=team,
-            ords=ords,
-            weight=weight,
-            actions={
-                (-1, +0),  # West
-                (+0, -1),  # South
-                (+0, +1),  # North
-                (+1, +0)}),  # East
-
-    def valid(self, move: tuple[namedtuple, namedtuple], action: tuple[int, int]) -> bool:
-        """Validate a Rook's move."""
-
-        pathway = None
-        src, dest = move
-        rank_dist, file_dist = action
-        if file_dist == 0:
-            rank_path = list(range(
-                min(int(src.rank), int(dest.rank)) + 1,
-                max(int(src.rank), int(dest.rank))))
-            if len(rank_path) > 0:
-                pathway = zip_longest(src.file, rank_path, fillvalue=src.file)
-        elif rank_dist == 0:
-            file_path = list(chr(file) for file in range(
-                min(ord(src.file), ord(dest.file)) + 1,
-                max(ord(src.file), ord(dest.file))))
-            if len(file_path) > 0:
-                pathway = zip_longest(file_path, src.rank, fillvalue=src.rank)
-        if pathway is not None:
-            for file, rank in pathway:
-                pos = file + str(rank)
-                block = self.get(pos)
-                if block is not None:
-                    raise Exception(f"Path is blocked by a {block.name}.")
-        src.piece.actions.add(action)
+        super().__init__(team=team, ords=ords, weight=weight)
+
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the Rook attacks from a square."""
+        return rook_attacks(square, occupancy)
 
 
 class Knight(ChessPiece):
     """A Knight chesspiece."""
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=8):
+    __slots__ = ()
+    name = 'Knight'
+    actions = frozenset({
+        (-2, -1),  # Far-west-near-south
+        (-2, +1),  # Far-west-near-north
+        (-1, -2),  # Near-west-far-south
+        (-1, +2),  # Near-west-far-north
+        (+1, -2),  # Near-east-far-south
+        (+1, +2),  # Near-east-far-north
+        (+2, -1),  # Far-east-near-south
+        (+2, +1)})  # Far-east-near-north
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=320):
         """Initialize a Knight's parameters."""
 
-        super().__init__(
-            team=team,
-            ords=ords,
-            weight=weight,
-            actions={
-                (-2, -1),  # Far-west-near-south
-                (-2, +1),  # Far-west-near-north
-                (-1, -2),  # Near-west-far-south
-                (-1, +2),  # Near-west-far-north
-                (+1, -2),  # Near-east-far-south
-                (+1, +2),  # Near-east-far-north
-                (+2, -1),  # Far-east-near-south
-                (+2, +1)})  # Far-east-near-north
-
-    def valid(self) -> bool:
-        """Validate a Knight's move."""
-        ...
+        super().__init__(team=team, ords=ords, weight=weight)
+
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the Knight attacks from a square."""
+        return KNIGHT[square]
 
 
 class Bishop(ChessPiece):
     """A Bishop chesspiece."""
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=8):
+    __slots__ = ()
+    name = 'Bishop'
+    actions = frozenset({
+        (-1, -1),  # Southwest
+        (-1, +1),  # Northwest
+        (+1, -1),  # Southeast
+        (+1, +1)})  # Northeast
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=330):
         """Initialize a Bishop's parameters."""
 
-        super().__init__(
-            team=team,
-            ords=ords,
-            weight=weight,
-            actions={
-                (-1, -1),  # Southwest
-                (-1, +1),  # Northwest
-                (+1, -1),  # Southeast
-                (+1, +1)}),  # Northeast
-
-    def valid(self, move: tuple[namedtuple, namedtuple], action: tuple[int, int]) -> bool:
-        """Validate a Bishop's move."""
-
-        src, dest = move
-        rank_dist, file_dist = action
-        if abs(file_dist) == abs(rank_dist):
-            if int(src.rank) < int(dest.rank):
-                rank_path = list(range(
-                    min(int(src.rank), int(dest.rank)) + 1,
-                    max(int(src.rank), int(dest.rank))))
-            else:
-                rank_path = list(range(
-                    max(int(src.rank), int(dest.rank)) - 1,
-                    min(int(src.rank), int(dest.rank)), -1))
-            if ord(src.file) < ord(dest.file):
-                file_path = list(chr(file) for file in range(
-                    min(ord(src.file), ord(dest.file)) + 1,
-                    max(ord(src.file), ord(dest.file))))
-            else:
-                file_path = list(chr(file) for file in range(
-                    max(ord(src.file), ord(dest.file)) - 1,
-                    min(ord(src.file), ord(dest.file)), -1))
-            if len(rank_path) > 0 and len(file_path) > 0:
-                pathway = zip(file_path, rank_path)
-        for file, rank in pathway:
-            pos = file + str(rank)
-            block = self.get(pos)
-            if block is not None:
-                raise Exception(f"Path is blocked by a {block.name}.")
-        src.piece.actions.add(action)
+        super().__init__(team=team, ords=ords, weight=weight)
+
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the Bishop attacks from a square."""
+        return bishop_attacks(square, occupancy)
 
 
 class Queen(ChessPiece):
     """A queen chesspiece."""
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=8):
+    __slots__ = ()
+    name = 'Queen'
+    actions = frozenset({
+        (-1, -1),  # Southwest
+        (-1, +0),  # West
+        (-1, +1),  # Northwest
+        (+0, -1),  # South
+        (+0, +1),  # North
+        (+1, -1),  # Southeast
+        (+1, +0),  # East
+        (+1, +1)})  # Northeast
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=900):
         """Initialize a Queen's parameters."""
 
-        super().__init__(
-            team=team,
-            ords=ords,
-            weight=weight,
-            actions={
-                (-1, -1),  # Southwest
-                (-1, +0),  # West
-                (-1, +1),  # Northwest
-                (+0, -1),  # South
-                (+0, +1),  # North
-                (+1, -1),  # Southeast
-                (+1, +0),  # East
-                (+1, +1)})  # Northeast
-
-    def valid(self, move: tuple[namedtuple, namedtuple], action: tuple[int, int]) -> bool:
-        """Validate a Queen's move."""
-
-        src, dest = move
-        rank_dist, file_dist = action
-        if file_dist == 0:
-            rank_path = list(range(
-                min(int(src.rank), int(dest.rank)) + 1,
-                max(int(src.rank), int(dest.rank))))
-            if len(rank_path) > 0:
-                pathway = zip_longest(src.file, rank_path, fillvalue=src.file)
-        elif rank_dist == 0:
-            file_path = list(chr(file) for file in range(
-                min(ord(src.file), ord(dest.file)) + 1,
-                max(ord(src.file), ord(dest.file))))
-            if len(file_path) > 0:
-                pathway = zip_longest(file_path, src.rank, fillvalue=src.rank)
-        elif abs(file_dist) == abs(rank_dist):
-            if int(src.rank) < int(dest.rank):
-                rank_path = list(range(
-                    min(int(src.rank), int(dest.rank)) + 1,
-                    max(int(src.rank), int(dest.rank))))
-            else:
-                rank_path = list(range(
-                    max(int(src.rank), int(dest.rank)) - 1,
-                    min(int(src.rank), int(dest.rank)), -1))
-            if ord(src.file) < ord(dest.file):
-                file_path = list(chr(file) for file in range(
-                    min(ord(src.file), ord(dest.file)) + 1,
-                    max(ord(src.file), ord(dest.file))))
-            else:
-                file_path = list(chr(file) for file in range(
-                    max(ord(src.file), ord(dest.file)) - 1,
-                    min(ord(src.file), ord(dest.file)), -1))
-            if len(rank_path) > 0 and len(file_path) > 0:
-                pathway = zip(file_path, rank_path)
-            for file, rank in pathway:
-                pos = file + str(rank)
-                block = self.get(pos)
-                if block is not None:
-                    raise Exception(f"Path is blocked by a {block.name}.")
-            src.piece.actions.add(action)
+        super().__init__(team=team, ords=ords, weight=weight)
+
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the Queen attacks from a square."""
+        return queen_attacks(square, occupancy)
 
 
 class King(ChessPiece):
     """A king chesspiece."""
 
-    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=8):
+    __slots__ = ()
+    name = 'King'
+    actions = frozenset({
+        (-1, -1),  # Southwest
+        (-1, +0),  # West
+        (-1, +1),  # Northwest
+        (+0, -1),  # South
+        (+0, +1),  # North
+        (+1, -1),  # Southeast
+        (+1, +0),  # East
+        (+1, +1)})  # Northeast
+
+    def __init__(self, team: Player=None, ords: tuple[int, int]=None, weight=20000):
         """Initialize a King's parameters."""
 
-        super().__init__(
-            team=team,
-            ords=ords,
-            weight=weight,
-            actions={
-                (-1, -1),  # Southwest
-                (-1, +0),  # West
-                (-1, +1),  # Northwest
-                (+0, -1),  # South
-                (+0, +1),  # North
-                (+1, -1),  # Southeast
-                (+1, +0),  # East
-                (+1, +1)})  # Northeast
-
-    def valid(self) -> bool:
-        """Validate a King's move."""
-        ...
+        super().__init__(team=team, ords=ords, weight=weight)
+
+    def attacks(self, square: int, occupancy: int) -> int:
+        """Return the bitboard of squares that the King attacks from a square."""
+        return KING[square]
 
 
 PIECES = (Pawn, Rook, Knight, Bishop, Queen, King)  # Arbitrary set of chess pieces
-PIECE_SETS = {  # Standard sets of chess pieces
-    'white': [*[Pawn(ords=[6, i]) for i in range(stop=8)]
-              +[Rook(ords=[7, i]) for i in range(step=8, stop=8)]
-              +[Knight(ords=[7, i]) for i in range(start=1, step=6, stop=7)]
-              +[Bishop(ords=[7, i]) for i in range(start=2, step=4, stop=6)]
-              +[Queen(ords=[7, 3])]
-              +[King(ords=[7, 4])]],
-    'black': [*[Pawn(ords=[1, i]) for i in range(stop=8)]
-              +[Rook(ords=[0, i]) for i in range(step=8, stop=8)]
-              +[Knight(ords=[0, i]) for i in range(start=1, step=6, stop=7)]
-              +[Bishop(ords=[0, i]) for i in range(start=2, step=4, stop=6)]
-              +[Queen(ords=[0, 4])]
-              +[King(ords=[0, 3])]]}
@@ -1,96 +1,400 @@
-from collections import namedtuple
-from env.constants import META
-from itertools import chain
+from collections import Counter, namedtuple
+from env.constants import CLOCK, SEARCH, TRANSPOSITION
+from env.movegen import exchange
 from math import inf
-from numpy import array, dot
+from env.ordering import MoveOrderer
+from env.transposition import TranspositionTable
+from time import monotonic, perf_counter
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search once its time or node budget runs out."""
 
 
 class Player:
     """A generic player."""
 
-    def __init__(self, piece_set=None, near=True):
-        """Initialize a player's piece set, pieces won, and point-of-view."""
+    __slots__ = ('near', 'team')
+
+    def __init__(self, near=True):
+        """Initialize a player's point-of-view and team."""
 
-        self.piece_set = piece_set
-        self.pieces_won = set()
         self.near = near
+        self.team = 'white' if near else 'black'  # The near player moves first
 
     def __str__(self):
         """Return a graphical representation of a player."""
-        return f"""{self.team}: {len(self.piece_set) + len(self.pieces_won)}"""
-
-    def claim(self, move, player) -> object:
-        """Claim a position on the board."""
-
-        if piece_captured := self.board.move(move):
-            if player is self.p1:  # Player takes Computer's piece
-                self.p1.pieces_won.add(piece_captured)
-                self.p2.pieces[piece_captured.name].remove(piece_captured)
-            else:  # Computer takes Player's piece
-                self.p2.pieces_won.add(piece_captured)
-                self.p1.pieces[piece_captured.name].remove(piece_captured)
-        return piece_captured
+        return self.team
 
     def get_moves(self, board) -> set:
-        """Return the set of legal moves that a player can make."""
-
-        legal_moves = set()
-        pieces = [*chain(self.piece_set.values())]
-        for piece, position in dot(array(pieces), array(META)):
-            move = piece.position, position
-            if board.move_is_legal(*move, self):
-                legal_moves.add((piece.position, position))
-        return legal_moves
+        """Return the set of legal moves that a player can make on their turn."""
+        return set(board.legal_moves()) if board.turn == self.team else set()
 
 
 class Computer(Player):
     """A computer with artificial intelligence."""
 
-    def __init__(self, near=False):
-        """Initialize a Computer's point-of-view."""
-        super().__init__(near)
+    def __init__(self, near=False, megabytes=TRANSPOSITION['megabytes'], policy=TRANSPOSITION['policy'],
+                 seconds=SEARCH['seconds'], nodes=SEARCH['nodes'],
+                 pvs=SEARCH['pvs'], null_move=SEARCH['null_move'], lmr=SEARCH['lmr'], batch=SEARCH['batch'],
+                 evaluator=None, book=None, tablebases=None, store=None, statistics=None, profiler=None):
+        """Initialize a Computer's point-of-view, table, search budget, selectivity, evaluator, books, and probes."""
+
+        super().__init__(near=near)
+        self.table = TranspositionTable(megabytes=megabytes, policy=policy)  # Kept between moves
+        self.orderer = MoveOrderer()  # Killer moves and history, kept between moves
+        self.seconds = seconds  # Time budget per search
+        self.node_budget = nodes  # Node budget per search, if any
+        self.deadline = inf
+        self.node_limit = inf
+        self.nodes = 0  # Nodes searched so far
+        self.pv = {}  # Principal variation of the last completed iteration, by Zobrist key
+        self.line = []  # Principal variation of the last completed iteration, in order
+        self.pvs = pvs  # Search moves after the first with a zero window
+        self.null_move = null_move  # Prune nodes where passing the turn still fails high
+        self.lmr = lmr  # Reduce the depth of late quiet moves
+        self.batch = batch  # Evaluate the leaves below each frontier node together
+        self.leaves = {}  # Static evaluations of the leaves below the current frontier node, by Zobrist key
+        self.evaluator = evaluator  # Anything with `evaluate(board, team)`, or else the game's own evaluation
+        self.book = book  # Anything with `choose(board)`, such as an opening Book, or None
+        self.tablebases = tablebases  # Anything with `probe(board)`, such as endgame Tablebases, or None
+        self.store = store  # Anything with `probe(board)`, `record(...)`, and `depth`, such as an AnalysisStore
+        self.reporter = None  # Called with the Computer after each completed iteration, if set
+        self.statistics = statistics  # Anything with `reset()` and `report(computer)`, such as SearchStatistics
+        self.profiler = profiler  # Anything with `enable()` and `disable()`, such as cProfile.Profile, or None
+        self.counts = Counter()  # Selectivity statistics of the last search
+        self.iterations = []  # (depth, nodes, seconds) of each completed iteration of the last search
+        self.results = []  # (depth, value, move) of each completed iteration of the last search
+        self.root_ply = 1  # Ply of the root of the current search
+        self.root_moves = None  # Moves the root is limited to, if any
+        self.bounds = None  # Root alpha of each depth from 1, and at 0 any mate, shared with other searches of the root
+        self.fail_lows = set()  # Depths whose root value is only an upper bound, below another search's
 
     def __str__(self):
         """Return a graphical representation of a Computer."""
         return super().__str__()
 
-    def ab_search(self, game, state, depth) -> tuple:
-        """Run an alpha-beta search on a game state."""
+    def ab_search(self, game, state, depth, seconds=None, nodes=None, moves=None) -> tuple:
+        """Run an iteratively deepened alpha-beta search on a game state, within a time and node budget.
+
+        Iterations deepen by one ply up to `state.depth`, and the best move of the deepest
+        completed iteration is returned. An iteration cut short by the budget is discarded.
+        The root may be limited to a subset of its moves.
+        """
+
+        seconds = self.seconds if seconds is None else seconds
+        nodes = self.node_budget if nodes is None else nodes
+        self.deadline = monotonic() + seconds
+        self.node_limit = inf if nodes is None else nodes
+        self.nodes = 0
+        self.pv, self.line = {}, []
+        self.counts, self.iterations, self.results, self.fail_lows = Counter(), [], [], set()
+        self.root_ply, self.root_moves = depth + 1, None if moves is None else set(moves)
+        if self.book is not None and moves is None and (move := self.book.choose(state.board)):
+            return move  # A known opening move, without searching
+        if self.store is not None and moves is None and (stored := self.store.probe(state.board)) \
+                and stored[0] >= min(state.depth - depth, self.store.depth):  # Searched deep enough before
+            plies, value, move = stored
+            self.counts['store_hits'] += 1
+            self.results, self.line = [(depth + plies, value, move)], [move]
+            if self.reporter is not None:
+                self.reporter(self)
+            return move
+        if self.statistics is not None:
+            self.statistics.reset()
+        if self.profiler is None:
+            return self.deepen(game, state, depth)
+        self.profiler.enable()
+        try:
+            return self.deepen(game, state, depth)
+        finally:
+            self.profiler.disable()
+
+    def deepen(self, game, state, depth) -> tuple:
+        """Search one ply deeper each iteration, until the budget runs out, and return the best move found."""
 
-        _, move = self.max_value(game, state, -inf, inf, depth + 1)
+        self.orderer.age()
+        start = monotonic()
+        board, root = state.board, len(state.board.history)
+        value = move = None
+        for horizon in range(depth + 1, state.depth + 1):
+            iteration = state._replace(depth=horizon)
+            try:
+                value, move = self.aspiration(game, iteration, value, depth + 1)
+            except SearchTimeout:  # Unwind the moves made by the unfinished iteration
+                while len(board.history) > root:
+                    board.unmake_move()
+                break
+            self.iterations.append((horizon, self.nodes, monotonic() - start))
+            self.results.append((horizon, value, move))
+            self.line = self.principal_variation(game, iteration)
+            self.pv = {}
+            for action in self.line:  # Key each move of the line by the position it is made from
+                self.pv[board.key] = action
+                board.make_move(action)
+            for _ in self.line:
+                board.unmake_move()
+            if self.reporter is not None:
+                self.reporter(self)
+            if self.bounds is not None and value >= SEARCH['mate'] - horizon and horizon not in self.fail_lows:
+                self.bounds[0] = value  # A mate, which no other search of the root can beat by much, so they stop
+            if move is None or abs(value) >= SEARCH['mate'] - horizon:  # Nothing deeper to find
+                break
+        if move is None:  # Not even one iteration completed, so play the table's move, or else the best-ordered
+            actions = game.actions(state) if self.root_moves is None else game.actions(state) & self.root_moves
+            entry = self.table.probe(board.key)
+            move = next(self.orderer.ordered(board, actions, depth + 1, entry[4] if entry else None), None)
+        elif self.store is not None and self.root_moves is None \
+                and (plies := self.results[-1][0] - depth) >= min(state.depth - depth, self.store.depth):
+            self.store.record(board, plies, value, move)  # Written back in the background
+        if self.statistics is not None:
+            self.statistics.report(self)
         return move
 
+    @staticmethod
+    def budget(left: float, increment: float=0.0, moves: int=None) -> float:
+        """Return the seconds to spend on a move, given the seconds left on the clock and its increment."""
+
+        seconds = min(left / (moves or CLOCK['moves']) + increment * CLOCK['increment'], left * CLOCK['reserve'])
+        return max(0.0, seconds - CLOCK['overhead'])
+
+    def stop(self) -> None:
+        """Run the current search's time budget out, from another thread, so that it returns its best move."""
+        self.deadline = -inf
+
+    def limit(self, deadline: float) -> None:
+        """Move the current search's deadline, from another thread, such as once a pondered move is played."""
+        self.deadline = deadline
+
+    def branching(self) -> float | None:
+        """Return the effective branching factor of the last search, from its two deepest iterations."""
+
+        if len(self.iterations) < 3:
+            return None
+        (_, first, _), (_, second, _), (_, third, _) = self.iterations[-3:]
+        return (third - second) / max(1, second - first)
+
+    def aspiration(self, game, state, guess, depth) -> tuple:
+        """Search the root within a window around a guessed value, widening it until the value falls inside."""
+
+        if guess is None:
+            return self.max_value(game, state, -inf, inf, depth)
+        delta = SEARCH['window']
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            value, move = self.max_value(game, state, alpha, beta, depth)
+            if value <= alpha and self.bounds is not None and value <= self.bounds[state.depth]:
+                return value, move  # Another search of the same root has a better move
+            if value <= alpha:  # Fail low
+                alpha = value - delta
+            elif value >= beta:  # Fail high
+                beta = value + delta
+            else: return value, move
+            delta *= 2
+
+    def principal_variation(self, game, state) -> list:
+        """Return the line of best moves from a state, as found in the transposition table."""
+
+        line, board = [], state.board
+        while len(line) < state.depth and (entry := self.table.probe(board.key)):
+            if (action := entry[4]) is None or action not in game.actions(state):
+                break
+            line.append(action)
+            state = game.result(state, action)
+        for _ in line:
+            board.unmake_move()
+        return line
+
+    def tick(self) -> None:
+        """Count a searched node, and stop the search once its budget runs out."""
+
+        self.nodes += 1
+        if self.nodes >= self.node_limit or not self.nodes % SEARCH['interval'] and (
+                monotonic() >= self.deadline or self.bounds is not None and self.bounds[0] > 0):
+            raise SearchTimeout
+
     def max_value(self, game, state, alpha, beta, depth):
-        """Return a maximum value from the decision tree."""
+        """Return a maximum value from the decision tree, for the player to move."""
 
-        if game.is_cutoff(state, depth) or game.is_terminal(state):
-            return game.evaluate(state), None
-        value = -inf
-        for action in game.actions(state):
-            successor, _ = self.min_value(game, game.result(state, action), alpha, beta, depth + 1)
+        self.tick()
+        if game.at_cutoff(state, depth):
+            return self.quiesce(game, state, alpha, beta, depth), None
+        key, draft, window = state.board.key, state.depth - depth, alpha
+        hash_move, counts = None, None if self.statistics is None else self.statistics.counts
+        if counts is not None:
+            counts['table_probes'] += 1
+        if entry := self.table.probe(key):  # Transposition
+            _, entry_draft, score, bound, hash_move = entry
+            score = self.from_table(score, depth)
+            if counts is not None:
+                counts['table_hits'] += 1
+            if depth > 1 and entry_draft >= draft and (  # Not the root, and searched deep enough
+                    bound == 'exact' or bound == 'lower' and score >= beta or bound == 'upper' and score <= alpha):
+                if counts is not None:
+                    counts['table_cutoffs'] += 1
+                return score, hash_move
+        if self.tablebases is not None and depth > self.root_ply \
+                and (solved := self.tablebases.probe(state.board)) is not None:  # A solved ending
+            self.counts['tablebase_hits'] += 1
+            result, plies = solved
+            return result * (SEARCH['mate'] - depth - plies), None
+        if not (actions := self.generate(game, state)):  # Checkmate or stalemate
+            return game.utility(state, depth), None
+        board, checked = state.board, game.in_check(state)
+        if self.null_move and depth > 1 and draft >= 2 and not checked and beta < SEARCH['mate'] / 2 \
+                and board.history and board.history[-1][0] is not None \
+                and board.occupancy[board.turn] & ~board.bitboards[board.turn]['Pawn'] \
+                & ~board.bitboards[board.turn]['King']:  # Zugzwang is unlikely with pieces besides pawns
+            self.counts['null_tries'] += 1
+            successor, _ = self.min_value(  # Pass the turn, and search the reply shallower
+                game, game.result(state, None)._replace(depth=state.depth - SEARCH['null_reduction']),
+                beta - 1, beta, depth + 1)
+            game.undo(state)
+            if successor >= beta:
+                self.counts['null_cutoffs'] += 1
+                return beta, None
+        if self.batch and draft == 0 and self.evaluator is None:  # Every child is a leaf, so evaluate them at once
+            start = perf_counter() if counts is not None else 0.0
+            self.leaves = game.evaluate_batch(state, list(actions))
+            if counts is not None:
+                self.statistics.seconds['evaluation'] += perf_counter() - start
+        if root := depth == self.root_ply and (self.root_moves is not None or self.bounds is not None):
+            if self.root_moves is not None:
+                actions = actions & self.root_moves
+        actions = self.orderer.ordered(  # Principal or best move first
+            board, actions, depth, self.pv.get(key, hash_move))
+        value, move, raised = -inf, None, False
+        if counts is not None:
+            counts['expanded'] += 1
+        for i, action in enumerate(actions):
+            if root and self.bounds is not None:  # Share the best root value found by any search
+                alpha = max(alpha, self.bounds[state.depth])
+            quiet = not self.orderer.capture(board, action)
+            child = game.result(state, action)
+            if i == 0 or not (self.pvs or self.lmr):
+                successor, _ = self.min_value(game, child, alpha, beta, depth + 1)
+            else:
+                reduction = 1 + (i >= SEARCH['lmr_moves'] * 2) if (
+                    self.lmr and quiet and i >= SEARCH['lmr_moves'] and draft >= SEARCH['lmr_draft']
+                    and not checked and not board.in_check()) else 0
+                ceiling = alpha + 1 if self.pvs else beta  # Zero window, to prove the move is no better
+                successor, _ = self.min_value(
+                    game, child._replace(depth=state.depth - reduction), alpha, ceiling, depth + 1)
+                if reduction:
+                    self.counts['reductions'] += 1
+                    if successor > alpha:  # Not refuted after all, so search it to full depth
+                        self.counts['reduction_researches'] += 1
+                        successor, _ = self.min_value(game, child, alpha, ceiling, depth + 1)
+                if self.pvs and alpha < successor < beta:  # Better than the principal variation
+                    self.counts['pvs_researches'] += 1
+                    successor, _ = self.min_value(game, child, alpha, beta, depth + 1)
+            game.undo(state)  # Search a single position, made and unmade in place
+            if root and self.bounds is not None and successor > alpha:
+                self.bounds[state.depth] = max(self.bounds[state.depth], successor)
+                raised = True
             if successor > value:
                 value, move = successor, action
                 alpha = max(alpha, value)
             if value >= beta:
-                return value, move
+                self.orderer.cutoff(board, action, depth, draft)
+                if counts is not None:
+                    counts['cutoffs'] += 1
+                    counts['first_cutoffs'] += i == 0
+                break
+        if root and self.bounds is not None:  # Every move failing low against the shared bound is no better
+            if raised:
+                self.fail_lows.discard(state.depth)
+            else: self.fail_lows.add(state.depth)
+        bound = 'upper' if value <= window or root and self.bounds is not None and not raised \
+            else 'lower' if value >= beta else 'exact'
+        overwrite = self.table.store(key, draft, self.to_table(value, depth), bound, move)
+        if counts is not None:
+            counts['table_stores'] += 1
+            counts['table_overwrites'] += overwrite
         return value, move
 
+    def quiesce(self, game, state, alpha, beta, depth) -> float:
+        """Return the value of a state once its profitable captures have played out, for the player to move.
+
+        The player may stand pat on the static evaluation, except in check, where every evasion is searched.
+        Captures that cannot lift the evaluation to alpha (delta pruning), or that lose material by
+        static exchange evaluation, are skipped.
+        """
+
+        self.tick()
+        if self.statistics is not None:
+            self.statistics.counts['quiescence_nodes'] += 1
+        board = state.board
+        if checked := game.in_check(state):
+            if not (actions := self.generate(game, state)):  # Checkmate
+                return game.utility(state, depth)
+            value = standing = -inf
+        else:
+            value = standing = self.leaves.pop(board.key) if board.key in self.leaves \
+                else self.evaluate(game, state)  # Stand pat
+            if value >= beta or depth >= SEARCH['depth'] * 2:
+                return value
+            alpha = max(alpha, value)
+            actions = self.generate(game, state, captures=True)
+        for action in self.orderer.ordered(board, actions, depth):
+            if not checked:
+                victim = board.squares[action[1]]
+                if victim is None and action[1] == board.en_passant and board.squares[action[0]].name == 'Pawn':
+                    victim = board.squares[action[0]]  # Any pawn weighs the same
+                gain = (victim.weight if victim else 0) + (SEARCH['delta'] if action[2] is None else inf)
+                if standing + gain <= alpha or exchange(board, action) < 0:
+                    continue
+            successor = -self.quiesce(game, game.result(state, action), -beta, -alpha, depth + 1)
+            game.undo(state)
+            if successor > value:
+                value = successor
+                alpha = max(alpha, value)
+            if value >= beta:
+                break
+        return value
+
+    def generate(self, game, state, captures=False) -> set:
+        """Return the legal moves of a state, or only its captures, timed when keeping statistics."""
+
+        if self.statistics is None:
+            return game.captures(state) if captures else game.actions(state)
+        start = perf_counter()
+        actions = game.captures(state) if captures else game.actions(state)
+        self.statistics.seconds['movegen'] += perf_counter() - start
+        return actions
+
+    def evaluate(self, game, state) -> int:
+        """Statically evaluate a state for the player to move, with the Computer's own evaluator or else the game's."""
+
+        if self.statistics is not None:
+            start = perf_counter()
+            value = game.evaluate(state) if self.evaluator is None \
+                else self.evaluator.evaluate(state.board, state.player.team)
+            self.statistics.seconds['evaluation'] += perf_counter() - start
+            return value
+        if self.evaluator is None:
+            return game.evaluate(state)
+        return self.evaluator.evaluate(state.board, state.player.team)
+
+    @staticmethod
+    def to_table(value: float, depth: int) -> float:
+        """Convert a mate score to count plies from the stored position rather than the root."""
+
+        if abs(value) < SEARCH['mate'] - SEARCH['depth'] * 2:
+            return value
+        return value + depth if value > 0 else value - depth
+
+    @staticmethod
+    def from_table(value: float, depth: int) -> float:
+        """Convert a stored mate score to count plies from the root again."""
+
+        if abs(value) < SEARCH['mate'] - SEARCH['depth'] * 2:
+            return value
+        return value - depth if value > 0 else value + depth
+
     def min_value(self, game, state, alpha, beta, depth):
-        """Return a minimum value from the decision tree."""
-
-        if game.is_cutoff(state, depth) or game.is_terminal(state):
-            return game.evaluate(state), None
-        value = inf
-        for action in game.actions(state):
-            successor, _ = self.max_value(game, game.result(state, action), alpha, beta, depth + 1)
-            if successor < value:
-                value, move = successor, action
-                beta = min(alpha, value)
-            if value <= alpha:
-                return value, move
-        return value, move
+        """Return a minimum value from the decision tree, for the player who just moved."""
 
+        value, move = self.max_value(game, state, -beta, -alpha, depth)
+        return -value, move
 
-TEAMS = {
-    'player': Player(),
-    'computer': Computer()}
@@ -0,0 +1,279 @@
+from asyncio import Condition, StreamReader, StreamWriter, create_task, current_task, gather, get_running_loop, \
+    start_server
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from env.chessboard import ChessBoard
+from env.constants import RIVALS, SEARCH, SERVER
+from env.notation import START
+from env.players import Computer
+from env.tournament import insufficient
+from env.workers import initialize, search
+from itertools import count
+from os import cpu_count
+from time import perf_counter
+
+
+class Session:
+    """A game between a client and the computer, with the computer's clock."""
+
+    __slots__ = ('id', 'client', 'board', 'computer', 'left', 'increment', 'seen', 'searching')
+
+    def __init__(self, id: int, client: StreamWriter, fen: str, computer: str, seconds: float,
+                 increment: float) -> None:
+        """Set up the board, and the team and clock of the computer."""
+
+        self.id = id
+        self.client = client
+        self.board = ChessBoard(fen=fen)
+        self.computer = computer  # Team the computer plays
+        self.left = seconds  # Seconds left on the computer's clock
+        self.increment = increment
+        self.seen = {self.board.key: 1}  # Occurrences of each position, for repetitions
+        self.searching = False  # A search of the computer's move is queued or running
+
+    def play(self, move: tuple[int, int, str | None]) -> None:
+        """Make a move on the board."""
+
+        self.board.make_move(move)
+        self.seen[self.board.key] = self.seen.get(self.board.key, 0) + 1
+
+    def outcome(self) -> str | None:
+        """Return the result of the game and how it ended, once it is over."""
+
+        board = self.board
+        if not board.legal_moves():
+            return ('0-1' if board.turn == 'white' else '1-0') + ' checkmate' if board.in_check() \
+                else '1/2-1/2 stalemate'
+        if board.halfmove >= 100:
+            return '1/2-1/2 fifty-move'
+        if self.seen[board.key] >= 3:
+            return '1/2-1/2 repetition'
+        if insufficient(board):
+            return '1/2-1/2 material'
+        return None
+
+
+class Scheduler:
+    """A bounded queue of searches, served round-robin across clients so that none can starve the others.
+
+    Clients queueing a search while it is full wait, and stop reading their commands until there is room,
+    which pushes back on them through their sockets.
+    """
+
+    def __init__(self, limit: int=SERVER['pending']) -> None:
+        """Start with no searches queued."""
+
+        self.limit = limit
+        self.queues = {}  # Searches queued by each client, oldest first
+        self.order = deque()  # Clients with queued searches, next served first
+        self.size = 0
+        self.changed = Condition()
+
+    async def put(self, client: object, job: object) -> None:
+        """Queue a client's search, once there is room."""
+
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.size < self.limit)
+            if client not in self.queues:
+                self.queues[client] = deque()
+                self.order.append(client)
+            self.queues[client].append(job)
+            self.size += 1
+            self.changed.notify_all()
+
+    async def get(self) -> object:
+        """Take the next client's oldest search, once there is one."""
+
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.size > 0)
+            client = self.order.popleft()
+            queue = self.queues[client]
+            job = queue.popleft()
+            if queue:  # To the back of the line
+                self.order.append(client)
+            else: del self.queues[client]
+            self.size -= 1
+            self.changed.notify_all()
+            return job
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the value below which a fraction of the values fall, or 0 of none."""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class GameServer:
+    """Serves games against the computer to clients on a socket, one command per line.
+
+    Commands are `new [color white|black] [seconds S] [increment I] [fen FEN]`, `move ID MOVE`,
+    `board ID`, `resign ID`, `stats`, and `quit`. The server answers `game ID FEN`, `ok ID`, `board ID FEN`,
+    `stats ...`, or `error ...` at once, then `move ID MOVE` once the computer replies, and `result ID RESULT
+    REASON` once a game ends. Searches run in a pool of processes, so the event loop never blocks on them.
+    """
+
+    def __init__(self, workers: int=SERVER['workers'], megabytes: float=SERVER['megabytes'],
+                 pending: int=SERVER['pending'], nodes: int=None) -> None:
+        """Start the pool of search processes."""
+
+        self.workers = workers or cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=initialize, initargs=(megabytes,))
+        self.scheduler = Scheduler(pending)
+        self.nodes = nodes  # Node budget of each search, if any, instead of the clock
+        self.sessions = {}  # Open games, by ID
+        self.ids = count(1)
+        self.latencies = deque(maxlen=SERVER['samples'])  # Seconds from each move to the computer's reply
+        self.server = None
+        self.dispatchers = []
+        self.clients = {}  # Task answering each connected client
+
+    async def start(self, host: str=SERVER['host'], port: int=SERVER['port']) -> int:
+        """Listen for clients, and start dispatching searches, one at a time per process. Return the port."""
+
+        self.server = await start_server(self.connect, host, port)
+        self.dispatchers = [create_task(self.dispatch()) for _ in range(self.workers)]
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Stop listening and dispatching, and shut the search processes down."""
+
+        self.server.close()
+        await self.server.wait_closed()
+        for client in self.clients:
+            client.close()
+        await gather(*self.clients.values(), return_exceptions=True)
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def send(client: StreamWriter, line: str) -> None:
+        """Write a line to a client."""
+
+        if not client.is_closing():
+            client.write((line + '\n').encode())
+
+    async def connect(self, reader: StreamReader, writer: StreamWriter) -> None:
+        """Answer a client's commands until it quits or disconnects, then close its games."""
+
+        self.clients[writer] = current_task()
+        try:
+            while line := await reader.readline():
+                if not await self.handle(writer, line.decode().strip()):
+                    break
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session in [session for session in self.sessions.values() if session.client is writer]:
+                del self.sessions[session.id]
+            del self.clients[writer]
+            writer.close()
+
+    async def handle(self, client: StreamWriter, line: str) -> bool:
+        """Answer a command, and return whether or not to keep reading."""
+
+        command, *tokens = line.split() or ['']
+        if command == 'new':
+            await self.new(client, tokens)
+        elif command in ('move', 'board', 'resign'):
+            if not tokens or not tokens[0].isdigit() or (session := self.sessions.get(int(tokens[0]))) is None \
+                    or session.client is not client:
+                self.send(client, f"error {tokens[0] if tokens else '-'} unknown game")
+            elif command == 'move':
+                await self.move(session, tokens[1:])
+            elif command == 'board':
+                self.send(client, f"board {session.id} {session.board.fen()}")
+            else: self.finish(session, ('1-0' if session.computer == 'white' else '0-1') + ' resignation')
+        elif command == 'stats':
+            latencies = list(self.latencies)
+            self.send(client, f"stats sessions {len(self.sessions)} pending {self.scheduler.size} " + ' '.join(
+                f"p{round(fraction * 100)} {percentile(latencies, fraction) * 1000:.1f}"
+                for fraction in (0.5, 0.9, 0.99)))
+        elif command == 'quit':
+            return False
+        elif command:
+            self.send(client, f"error - unknown command {command}")
+        return True
+
+    async def new(self, client: StreamWriter, tokens: list[str]) -> None:
+        """Open a game from `color`, `seconds`, `increment`, and `fen` options, with the client's color first."""
+
+        head = tokens[:tokens.index('fen')] if 'fen' in tokens else tokens
+        fen = ' '.join(tokens[len(head) + 1:]) or START
+        options = dict(zip(head[::2], head[1::2]))
+        if len(self.sessions) >= SERVER['sessions']:
+            self.send(client, "error - busy")
+            return
+        try:
+            session = Session(next(self.ids), client, fen, RIVALS[options.get('color', 'white')],
+                              float(options.get('seconds', SERVER['seconds'])),
+                              float(options.get('increment', SERVER['increment'])))
+        except (KeyError, ValueError, IndexError):
+            self.send(client, "error - cannot start the game")
+            return
+        self.sessions[session.id] = session
+        self.send(client, f"game {session.id} {session.board.fen()}")
+        if (result := session.outcome()) is not None:
+            self.finish(session, result)
+        elif session.board.turn == session.computer:
+            await self.request(session)
+
+    async def move(self, session: Session, tokens: list[str]) -> None:
+        """Play the client's move in a game, and queue the computer's reply."""
+
+        board = session.board
+        if session.searching or board.turn == session.computer:
+            self.send(session.client, f"error {session.id} not your turn")
+            return
+        try: move = board.texttomove(tokens[0])
+        except (IndexError, ValueError): move = None
+        if move not in board.legal_moves():
+            self.send(session.client, f"error {session.id} illegal move")
+            return
+        session.play(move)
+        self.send(session.client, f"ok {session.id}")
+        if (result := session.outcome()) is not None:
+            self.finish(session, result)
+        else: await self.request(session)
+
+    async def request(self, session: Session) -> None:
+        """Queue a search of the computer's move, waiting for room in the queue."""
+
+        session.searching = True
+        await self.scheduler.put(session.client, (session, perf_counter()))
+
+    async def dispatch(self) -> None:
+        """Run queued searches in the pool, one at a time, and play their moves."""
+
+        loop = get_running_loop()
+        while True:
+            session, queued = await self.scheduler.get()
+            if session.id not in self.sessions:  # Closed while queued
+                continue
+            seconds = Computer.budget(session.left, session.increment)
+            try:
+                text, _, _, spent = await loop.run_in_executor(
+                    self.pool, search, session.board.fen(), SEARCH['depth'], seconds, self.nodes)
+            except Exception as error:  # A failed process ends only its own search
+                session.searching = False
+                self.send(session.client, f"error {session.id} search failed: {error!r}")
+                continue
+            session.searching = False
+            session.left += session.increment - spent
+            if session.id not in self.sessions or text is None:
+                continue
+            session.play(session.board.texttomove(text))
+            self.latencies.append(perf_counter() - queued)
+            self.send(session.client, f"move {session.id} {text}")
+            if (result := session.outcome()) is not None:
+                self.finish(session, result)
+
+    def finish(self, session: Session, result: str) -> None:
+        """End a game, and report its result."""
+
+        self.sessions.pop(session.id, None)
+        self.send(session.client, f"result {session.id} {result}")
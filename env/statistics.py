@@ -0,0 +1,129 @@
+from collections import Counter
+from json import dumps
+from sys import _current_frames
+from threading import Event, Thread, get_ident
+from time import perf_counter, time
+
+
+class SearchStatistics:
+    """Counters and timers of a Computer's searches, reported once each search ends.
+
+    A Computer only counts while it has one, so searching without it costs nothing extra.
+    Each report is kept as `last`, and appended as a JSON line to the log file, if any.
+    """
+
+    def __init__(self, log: str=None) -> None:
+        """Start with empty counters, and remember the log file."""
+
+        self.log = log
+        self.counts = Counter()  # Events of the current search, such as cutoffs and table hits
+        self.seconds = Counter()  # Seconds spent generating moves and evaluating, in the current search
+        self.started = 0.0
+        self.last = None  # Report of the last search
+
+    def reset(self) -> None:
+        """Clear the counters, as a search starts."""
+
+        self.counts, self.seconds = Counter(), Counter()
+        self.started = perf_counter()
+
+    def report(self, computer: object) -> dict:
+        """Summarize the current search of a Computer, then log it.
+
+        Rates are fractions: of expanded nodes that cut off, of cutoffs made by the first move,
+        of table probes that found their position, of table stores that evicted another position,
+        and of nodes searched in quiescence.
+        """
+
+        counts, elapsed = self.counts, perf_counter() - self.started
+        depths, previous = [], (0, 0.0)
+        for depth, nodes, seconds in computer.iterations:  # Each iteration's share of the cumulative totals
+            spent = seconds - previous[1]
+            depths.append({'depth': depth, 'nodes': nodes - previous[0], 'seconds': round(spent, 6),
+                           'nps': int((nodes - previous[0]) / spent) if spent > 0 else 0})
+            previous = nodes, seconds
+        self.last = {
+            'time': time(),
+            'nodes': computer.nodes,
+            'seconds': round(elapsed, 6),
+            'nps': int(computer.nodes / elapsed) if elapsed > 0 else 0,
+            'depths': depths,
+            'cutoff_rate': rate(counts['cutoffs'], counts['expanded']),
+            'first_cutoff_rate': rate(counts['first_cutoffs'], counts['cutoffs']),
+            'table_probes': counts['table_probes'],
+            'table_hit_rate': rate(counts['table_hits'], counts['table_probes']),
+            'table_cutoff_rate': rate(counts['table_cutoffs'], counts['table_probes']),
+            'table_overwrite_rate': rate(counts['table_overwrites'], counts['table_stores']),
+            'quiescence_share': rate(counts['quiescence_nodes'], computer.nodes),
+            'movegen_seconds': round(self.seconds['movegen'], 6),
+            'evaluation_seconds': round(self.seconds['evaluation'], 6),
+            'selectivity': dict(computer.counts)}
+        if self.log is not None:
+            with open(self.log, 'a') as file:
+                file.write(dumps(self.last) + '\n')
+        return self.last
+
+
+def rate(part: int, whole: int) -> float:
+    """Return a part of a whole as a fraction, or 0 of nothing."""
+    return round(part / whole, 4) if whole else 0.0
+
+
+class Sampler:
+    """A sampling profiler, which records where one thread is running at a fixed interval.
+
+    It has cProfile's `enable` and `disable`, so either can wrap a search as a Computer's `profiler`.
+    Sampling costs the searching thread almost nothing, which makes it fit to leave on while playing.
+    """
+
+    def __init__(self, interval: float=0.001) -> None:
+        """Start with no samples."""
+
+        self.interval = interval
+        self.samples = Counter()  # Samples of each (file, line, function) innermost frame
+        self.stacks = Counter()  # Samples of each function anywhere on the stack
+        self.thread = None
+        self.stopped = Event()
+
+    def enable(self) -> None:
+        """Start sampling the calling thread."""
+
+        target = get_ident()
+        self.stopped.clear()
+        self.thread = Thread(target=self.sample, args=(target,), daemon=True)
+        self.thread.start()
+
+    def disable(self) -> None:
+        """Stop sampling."""
+
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+
+    def sample(self, target: int) -> None:
+        """Record the target thread's frames until stopped."""
+
+        while not self.stopped.wait(self.interval):
+            if (frame := _current_frames().get(target)) is None:
+                continue
+            code = frame.f_code
+            self.samples[code.co_filename, frame.f_lineno, code.co_name] += 1
+            seen = set()
+            while frame is not None:
+                if (name := (frame.f_code.co_filename, frame.f_code.co_name)) not in seen:
+                    seen.add(name)
+                    self.stacks[name] += 1
+                frame = frame.f_back
+
+    def print_stats(self, limit: int=20) -> None:
+        """Print the most sampled lines, and the functions most often on the stack, like cProfile's report."""
+
+        total = max(1, sum(self.samples.values()))
+        print(f"{total} samples, every {self.interval * 1000:g} ms")
+        print("Lines:")
+        for (filename, line, name), count in self.samples.most_common(limit):
+            print(f"{count / total:7.1%}  {name} ({filename}:{line})")
+        print("Inclusive:")
+        for (filename, name), count in self.stacks.most_common(limit):
+            print(f"{count / total:7.1%}  {name} ({filename})")
@@ -0,0 +1,112 @@
+from atexit import register
+from env.constants import STORE
+from queue import Empty, Queue
+from sqlite3 import connect
+from threading import Thread, local
+from time import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    key INTEGER PRIMARY KEY,  -- Zobrist key, as a signed 64-bit integer
+    depth INTEGER NOT NULL,  -- Plies searched
+    score INTEGER NOT NULL,  -- Centipawns, for the side to move
+    move TEXT NOT NULL,  -- Best move, such as e2e4
+    stamp REAL NOT NULL);  -- Time written
+CREATE INDEX IF NOT EXISTS shallowest ON analysis (depth, stamp);
+"""
+UPSERT = """
+INSERT INTO analysis (key, depth, score, move, stamp) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET depth = excluded.depth, score = excluded.score, move = excluded.move,
+    stamp = excluded.stamp WHERE excluded.depth >= analysis.depth
+"""
+
+
+def signed(key: int) -> int:
+    """Convert an unsigned 64-bit Zobrist key to the signed integer SQLite stores."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class AnalysisStore:
+    """Searched positions kept in an SQLite database, keyed by Zobrist key, across runs and processes.
+
+    Lookups read the database directly, each thread through its own connection. Results are written
+    back in batches by a background thread, so a search never waits on the disk. Once the store holds
+    more than `entries` positions, the shallowest (then oldest) are evicted.
+    """
+
+    def __init__(self, path: str=STORE['path'], entries: int=STORE['entries'], depth: int=STORE['depth']) -> None:
+        """Open or create the database, and start the writer thread."""
+
+        self.path = path
+        self.entries = entries
+        self.depth = depth  # Plies a result needs to be written back, or played without searching
+        self.local = local()  # Connection of each thread
+        self.connection().executescript(SCHEMA)
+        self.queue = Queue()  # Results waiting to be written, then None to stop
+        self.writer = Thread(target=self.write, daemon=True)
+        self.writer.start()
+        register(self.close)  # Write what is left when the interpreter exits
+
+    def connection(self) -> object:
+        """Return the calling thread's connection, opening it first if need be."""
+
+        if (db := getattr(self.local, 'db', None)) is None:
+            db = self.local.db = connect(self.path, timeout=STORE['timeout'], isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")  # Readers in other processes do not block the writer
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def __len__(self) -> int:
+        """Return the number of positions stored."""
+        return self.connection().execute("SELECT count(*) FROM analysis").fetchone()[0]
+
+    def probe(self, board: object) -> tuple[int, float, tuple[int, int, str | None]] | None:
+        """Return the depth, score, and best move stored for a board, if any, and if its move is legal there."""
+
+        row = self.connection().execute(
+            "SELECT depth, score, move FROM analysis WHERE key = ?", (signed(board.key),)).fetchone()
+        if row is None:
+            return None
+        depth, score, text = row
+        if (move := board.texttomove(text)) not in board.legal_moves():  # Another position with the same key
+            return None
+        return depth, score, move
+
+    def record(self, board: object, depth: int, score: float, move: tuple[int, int, str | None]) -> None:
+        """Queue a board's search result to be written, keeping a deeper result already stored."""
+        self.queue.put((signed(board.key), depth, score, board.movetotext(move), time()))
+
+    def write(self) -> None:
+        """Write queued results in batches, evicting the shallowest positions beyond the size limit, until stopped."""
+
+        db = self.connection()
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                while True:  # Everything else already waiting
+                    batch.append(self.queue.get_nowait())
+            except Empty:
+                pass
+            running = None not in batch
+            rows = [row for row in batch if row is not None]
+            if rows:
+                db.execute("BEGIN IMMEDIATE")
+                db.executemany(UPSERT, rows)
+                if (excess := db.execute("SELECT count(*) FROM analysis").fetchone()[0] - self.entries) > 0:
+                    db.execute("DELETE FROM analysis WHERE key IN "
+                               "(SELECT key FROM analysis ORDER BY depth, stamp LIMIT ?)", (excess,))
+                db.execute("COMMIT")
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self) -> None:
+        """Wait until every queued result is written."""
+        self.queue.join()
+
+    def close(self) -> None:
+        """Write every queued result, then stop the writer thread."""
+
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
@@ -0,0 +1,292 @@
+from concurrent.futures import ProcessPoolExecutor
+from env.attacks import KING, KNIGHT, PAWN, bishop_attacks, queen_attacks, rook_attacks
+from env.bitboard import squares
+from env.constants import RIVALS, TABLEBASE
+from mmap import ACCESS_READ, mmap
+from os import cpu_count, makedirs, path as paths
+from struct import Struct
+
+NAMES = {'K': 'King', 'Q': 'Queen', 'R': 'Rook', 'B': 'Bishop', 'N': 'Knight', 'P': 'Pawn'}
+SYMBOLS = {name: letter for letter, name in NAMES.items()}
+ORDER = 'KQRBNP'  # Order of the letters in a signature
+HEADER = Struct('>4sB')  # Magic, and bits per entry
+MAGIC = b'TB01'
+SAFE = 0xFF  # Counter of a position whose defender can escape by capturing into a drawn ending
+ATTACKS = {  # Squares attacked from a square, given the occupancy, by each of the strong side's chesspieces
+    'King': lambda square, occupancy: KING[square],
+    'Queen': queen_attacks,
+    'Rook': rook_attacks,
+    'Bishop': bishop_attacks,
+    'Knight': lambda square, occupancy: KNIGHT[square],
+    'Pawn': lambda square, occupancy: PAWN['white'][square]}
+
+
+class Layout:
+    """The positions of a signature, such as `KRK`, in which a strong side (as white) faces a bare king.
+
+    Chesspieces are indexed as strong king, weak king, then the strong side's other chesspieces,
+    after the side to move, 0 for the strong side and 1 for the weak side.
+    """
+
+    def __init__(self, signature: str) -> None:
+        """Split a signature into its chesspieces."""
+
+        strong, weak = signature[:signature.index('K', 1)], signature[signature.index('K', 1):]
+        if weak != 'K' or strong[0] != 'K' or any(letter not in NAMES for letter in strong):
+            raise ValueError(f"Cannot build the ending {signature!r}, only a strong side against a bare king.")
+        self.signature = signature
+        self.names = ['King', 'King'] + [NAMES[letter] for letter in strong[1:]]
+        self.size = 2 * 64 ** len(self.names)
+
+    def index(self, turn: int, placed: list[int]) -> int:
+        """Return the index of a position."""
+
+        index = turn
+        for square in placed:
+            index = index * 64 + square
+        return index
+
+    def unindex(self, index: int) -> tuple[int, list[int]]:
+        """Return the side to move and squares of the chesspieces of an index."""
+
+        placed = []
+        for _ in self.names:
+            index, square = divmod(index, 64)
+            placed.append(square)
+        return index, placed[::-1]
+
+    def attacks(self, placed: list[int], occupancy: int) -> int:
+        """Return the squares attacked by the strong side."""
+
+        attacked = 0
+        for i, (name, square) in enumerate(zip(self.names, placed)):
+            if i != 1:
+                attacked |= ATTACKS[name](square, occupancy)
+        return attacked
+
+    def legal(self, turn: int, placed: list[int]) -> bool:
+        """Determine whether or not a position can arise, with the side not to move out of check."""
+
+        if len(set(placed)) != len(placed) or KING[placed[0]] >> placed[1] & 1 or any(
+                name == 'Pawn' and not 8 <= square < 56 for name, square in zip(self.names, placed)):
+            return False
+        occupancy = sum(1 << square for square in placed)
+        return turn == 1 or not self.attacks(placed, occupancy) >> placed[1] & 1
+
+
+def promoted(layout: Layout, placed: list[int], pawn: int, letter: str) -> tuple[str, int]:
+    """Return the signature and index, with the weak side to move, of a position after a pawn promotes."""
+
+    extras = sorted((ORDER.index(letter if i == pawn else SYMBOLS[name]), placed[i] + (8 if i == pawn else 0))
+                    for i, name in enumerate(layout.names) if i > 1)
+    signature = 'K' + ''.join(ORDER[rank] for rank, _ in extras) + 'K'
+    return signature, Layout(signature).index(1, placed[:2] + [square for _, square in extras])
+
+
+def captured(layout: Layout, placed: list[int], piece: int) -> tuple[str, int]:
+    """Return the signature and index, with the strong side to move, of a position after the weak king captures."""
+
+    extras = sorted((ORDER.index(SYMBOLS[name]), placed[i]) for i, name in enumerate(layout.names)
+                    if i > 1 and i != piece)
+    signature = 'K' + ''.join(ORDER[rank] for rank, _ in extras) + 'K'
+    return signature, Layout(signature).index(0, [placed[0], placed[piece]] + [square for _, square in extras])
+
+
+def drawn(signature: str) -> bool:
+    """Determine whether or not an ending is drawn whatever the position, for lack of mating material."""
+    return signature[1:-1] in ('', 'B', 'N')
+
+
+def _initialize(signature: str, directory: str, start: int, stop: int) -> tuple[bytes, list, list, list]:
+    """Count the escapes of each weak-to-move position in a range, and find its checkmates, promotions, and captures."""
+
+    layout, endings = Layout(signature), Tablebases(directory)
+    counters, mates, promotions, captures = bytearray(stop - start), [], [], []
+    for index in range(start, stop):
+        turn, placed = layout.unindex(index)
+        if not layout.legal(turn, placed):
+            continue
+        occupancy = sum(1 << square for square in placed)
+        if turn == 0:  # Promotions leave the table, so their values come from smaller endings
+            best = None
+            for i, name in enumerate(layout.names):
+                if name == 'Pawn' and placed[i] >= 48 and not occupancy >> placed[i] + 8 & 1:
+                    for letter in 'QRBN':
+                        child, child_index = promoted(layout, placed, i, letter)
+                        if (code := endings.code(child, child_index)) and (best is None or code < best):
+                            best = code  # Mated in code - 1 plies, so this wins in code plies
+            if best is not None:
+                promotions.append((best, index))
+            continue
+        king = placed[1]
+        attacked = layout.attacks(placed, occupancy & ~(1 << king))  # Seen through the weak king
+        count, losses = 0, []
+        for dest in range(64):
+            if KING[king] >> dest & 1 and not attacked >> dest & 1:
+                if occupancy >> dest & 1:  # Capturing leaves a smaller ending, solved already
+                    child, child_index = captured(layout, placed, placed.index(dest))
+                    if drawn(child) or not (code := endings.code(child, child_index)):
+                        count = SAFE
+                        break
+                    losses.append(code - 1)  # Lost once the strong side's win there is reached
+                count += 1
+        counters[index - start] = count
+        if count == SAFE:
+            continue
+        captures.extend((plies, index) for plies in losses)
+        if count == 0 and attacked >> king & 1:
+            mates.append(index)
+    return bytes(counters), mates, promotions, captures
+
+
+def generate(signature: str, directory: str=TABLEBASE['directory'], workers: int=TABLEBASE['workers']) -> str:
+    """Solve an ending by retrograde analysis, and write its distances to mate to a bit-packed file.
+
+    Worker processes count every position's escapes in parallel. Then, ply by ply from the
+    checkmates, each newly lost position makes its predecessors won, and each newly won position
+    takes an escape away from its predecessors, which are lost once they have none left.
+    """
+
+    layout = Layout(signature)
+    makedirs(directory, exist_ok=True)
+    workers = workers or cpu_count() or 1
+    chunk = -(-layout.size // (workers * 4))
+    for child in {signature[:i] + signature[i + 1:] for i in range(1, len(signature) - 1)}:
+        if not drawn(child) and not paths.exists(paths.join(directory, child + TABLEBASE['suffix'])):
+            raise ValueError(f"Generate {child} before {signature}, as captures lead into it.")
+    counters, levels, losses = bytearray(), {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_initialize, signature, directory, start, min(start + chunk, layout.size))
+                   for start in range(0, layout.size, chunk)]
+        for future in futures:
+            part, mates, promotions, captures = future.result()
+            counters += part
+            levels.setdefault(0, []).extend(mates)
+            for plies, index in promotions:
+                levels.setdefault(plies, []).append(index)
+            for plies, index in captures:
+                losses.setdefault(plies, []).append(index)
+    codes = bytearray(layout.size)  # Distance to mate plus one, or 0 for a draw
+    plies = 0
+    while plies <= max([*levels, *losses], default=-1):
+        for index in losses.pop(plies, ()):  # Captures into smaller endings, won for the strong side by now
+            counters[index] -= 1
+            if not counters[index]:
+                levels.setdefault(plies + 1, []).append(index)
+        for index in levels.pop(plies, ()):
+            if codes[index]:  # Already resolved, sooner
+                continue
+            codes[index] = plies + 1
+            turn, placed = layout.unindex(index)
+            occupancy = sum(1 << square for square in placed)
+            for predecessor in retractions(layout, turn, placed, occupancy):
+                if turn == 1:  # A loss for the weak side makes every strong move into it a win
+                    if not codes[predecessor]:
+                        levels.setdefault(plies + 1, []).append(predecessor)
+                elif counters[predecessor] != SAFE and not codes[predecessor]:
+                    counters[predecessor] -= 1
+                    if not counters[predecessor]:  # Every escape is lost
+                        levels.setdefault(plies + 1, []).append(predecessor)
+        plies += 1
+    return write(codes, paths.join(directory, signature + TABLEBASE['suffix']))
+
+
+def retractions(layout: Layout, turn: int, placed: list[int], occupancy: int) -> object:
+    """Yield the indices of the legal positions that a position can be reached from by one non-capturing move."""
+
+    if turn == 0:  # The weak king just moved
+        king = placed[1]
+        for src in range(64):
+            if KING[king] >> src & 1 and not occupancy >> src & 1 and not KING[placed[0]] >> src & 1:
+                yield layout.index(1, [placed[0], src] + placed[2:])
+        return
+    for i, name in enumerate(layout.names):  # A strong chesspiece just moved
+        if i == 1:
+            continue
+        dest = placed[i]
+        if name == 'Pawn':
+            sources = [dest - 8] if dest >= 16 and not occupancy >> dest - 8 & 1 else []
+            if 24 <= dest < 32 and sources and not occupancy >> dest - 16 & 1:
+                sources.append(dest - 16)
+        else: sources = [src for src in range(64)
+                         if ATTACKS[name](dest, occupancy) >> src & 1 and not occupancy >> src & 1]
+        for src in sources:
+            before = placed[:i] + [src] + placed[i + 1:]
+            if layout.legal(0, before):
+                yield layout.index(0, before)
+
+
+def write(codes: bytearray, path: str) -> str:
+    """Bit-pack codes into a tablebase file, with as few bits per code as the largest needs."""
+
+    bits = max(max(codes, default=0).bit_length(), 1)
+    packed = bytearray(-(-len(codes) * bits // 8) + 1)  # Padded, so every code can be read as two bytes
+    for index, code in enumerate(codes):
+        if code:
+            bit = index * bits
+            window = code << (bit & 7)
+            packed[bit >> 3] |= window & 0xFF
+            packed[(bit >> 3) + 1] |= window >> 8
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, bits) + packed)
+    return path
+
+
+class Tablebases:
+    """The endings solved in a directory, each memory-mapped when first probed."""
+
+    def __init__(self, directory: str=TABLEBASE['directory']) -> None:
+        """Remember the directory of the tablebase files."""
+
+        self.directory = directory
+        self.maps = {}  # (map, bits) of each signature, or None where there is no file
+        self.pieces = TABLEBASE['pieces']
+
+    def table(self, signature: str) -> tuple | None:
+        """Return the map and bits per code of a signature's file, if there is one."""
+
+        if signature not in self.maps:
+            file_path = paths.join(self.directory, signature + TABLEBASE['suffix'])
+            if not paths.exists(file_path):
+                self.maps[signature] = None
+            else:
+                with open(file_path, 'rb') as file:
+                    data = mmap(file.fileno(), 0, access=ACCESS_READ)
+                magic, bits = HEADER.unpack_from(data)
+                if magic != MAGIC:
+                    raise ValueError(f"Cannot read the tablebase {file_path!r}.")
+                self.maps[signature] = data, bits
+        return self.maps[signature]
+
+    def code(self, signature: str, index: int) -> int:
+        """Return the code of a position in an ending: its distance to mate plus one, or 0 for a draw."""
+
+        if (table := self.table(signature)) is None:
+            return 0
+        data, bits = table
+        bit = index * bits
+        offset = HEADER.size + (bit >> 3)
+        return int.from_bytes(data[offset:offset + 2], 'little') >> (bit & 7) & (1 << bits) - 1
+
+    def probe(self, board: object) -> tuple[int, int] | None:
+        """Return the result of a board for the side to move, and its plies to mate, or None if it is unsolved.
+
+        The result is 1 for a win, 0 for a draw, and -1 for a loss, where 0 plies means checkmated already.
+        """
+
+        if (board.occupancy['white'] | board.occupancy['black']).bit_count() > self.pieces:
+            return None
+        letters = {team: ''.join(letter * board.count(team, NAMES[letter]) for letter in ORDER) for team in RIVALS}
+        if letters['white'] == 'K' and letters['black'] == 'K':
+            return 0, 0
+        strong = 'white' if letters['black'] == 'K' else 'black' if letters['white'] == 'K' else None
+        if strong is None or self.table(signature := letters[strong] + 'K') is None:
+            return None
+        flip = 0 if strong == 'white' else 56  # Seen from the strong side, as white
+        placed = [square for team, letter in ((strong, 'K'), (RIVALS[strong], 'K'), *(
+            (strong, letter) for letter in dict.fromkeys(signature[1:-1])))  # Each type in order, by square
+                  for square in sorted(square ^ flip for square in squares(board.bitboards[team][NAMES[letter]]))]
+        turn = 0 if board.turn == strong else 1
+        if not (code := self.code(signature, Layout(signature).index(turn, placed))):
+            return 0, 0
+        return (1 if turn == 0 else -1), code - 1
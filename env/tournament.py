@@ -0,0 +1,169 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from env.chessboard import ChessBoard
+from env.constants import SEARCH, STATE, TOURNAMENT
+from env.game import Game
+from env.notation import START, read_epd, read_pgn, write_pgn
+from env.players import Computer
+from itertools import count
+from math import log, log10, sqrt
+from os import cpu_count
+from random import Random
+from time import monotonic
+
+RESULTS = {'1-0': 1.0, '1/2-1/2': 0.5, '0-1': 0.0}  # Score of white for each result
+
+
+def openings(path: str=None, games: int=TOURNAMENT['games'], plies: int=TOURNAMENT['random_plies']) -> object:
+    """Yield the starting position of each pair of games, from an EPD or PGN suite, or else random openings.
+
+    Openings that cannot be read, or that leave no legal move, are skipped.
+    """
+
+    if path is None:
+        seeds, pairs = count(), (games + 1) // 2
+        while pairs:
+            board, random = ChessBoard(fen=START), Random(next(seeds))
+            for _ in range(plies):
+                if not (moves := board.legal_moves()):
+                    break
+                board.make_move(random.choice(sorted(moves)))
+            if board.legal_moves():  # Not already checkmate or stalemate
+                pairs -= 1
+                yield board.fen()
+    elif path.lower().endswith('.pgn'):
+        for tags, moves in read_pgn(path):  # Each game's moves make a line to start from
+            try:
+                board = ChessBoard(fen=tags.get('FEN', START))
+                for san in moves:
+                    board.make_move(board.santomove(san))
+            except ValueError:
+                continue
+            if board.legal_moves():
+                yield board.fen()
+    else:
+        for fen, _ in read_epd(path):
+            try: board = ChessBoard(fen=fen)
+            except ValueError: continue
+            if board.legal_moves():
+                yield fen
+
+
+def insufficient(board: ChessBoard) -> bool:
+    """Determine whether or not neither team has the material to checkmate."""
+
+    for team in ('white', 'black'):
+        if board.count(team, 'Pawn') or board.count(team, 'Rook') or board.count(team, 'Queen') \
+                or board.count(team, 'Bishop') + board.count(team, 'Knight') > 1:
+            return False
+    return True
+
+
+def match(fen: str, names: tuple[str, str], options: tuple[dict, dict], clock: tuple[float, float],
+          nodes: int | None, rounds: str) -> tuple[str, str]:
+    """Play a game between two engine configurations, white first, and return its result and its PGN."""
+
+    game = Game(Computer(near=True, **options[0]), Computer(near=False, **options[1]), fen=fen, ponder=False)
+    board, base, increment = game.board, *clock
+    players = {'white': game.p1, 'black': game.p2}
+    left = {'white': base, 'black': base}
+    seen, moves, result, termination = {board.key: 1}, [], None, 'normal'
+    while result is None:
+        team = board.turn
+        player, opponent = players[team], players['black' if team == 'white' else 'white']
+        start = monotonic()
+        move = player.ab_search(game, STATE(board, player, opponent, SEARCH['depth']), 0,
+                                seconds=player.budget(left[team], increment), nodes=nodes)
+        left[team] += increment - (monotonic() - start)
+        moves.append(board.movetosan(move))
+        board.make_move(move)
+        seen[board.key] = seen.get(board.key, 0) + 1
+        if left[team] < 0 and nodes is None:
+            result, termination = ('0-1' if team == 'white' else '1-0'), 'time forfeit'
+        elif not board.legal_moves():
+            result = ('1-0' if team == 'white' else '0-1') if board.in_check() else '1/2-1/2'
+        elif board.halfmove >= 100 or seen[board.key] >= 3 or insufficient(board) \
+                or len(moves) >= TOURNAMENT['plies']:
+            result, termination = '1/2-1/2', 'adjudication'
+    tags = {'Event': 'Self-play', 'Site': '?', 'Date': date.today().strftime('%Y.%m.%d'), 'Round': rounds,
+            'White': names[0], 'Black': names[1], 'TimeControl': f"{base:g}+{increment:g}",
+            'Termination': termination}
+    if fen != START:
+        tags.update(SetUp='1', FEN=fen)
+    return result, write_pgn(tags, moves, result)
+
+
+def elo(score: float) -> float:
+    """Return the Elo difference that an expected score corresponds to."""
+
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * log10(1 / score - 1)
+
+
+def expected(difference: float) -> float:
+    """Return the expected score of an Elo difference."""
+    return 1 / (1 + 10 ** (-difference / 400))
+
+
+def statistics(wins: int, draws: int, losses: int, elo0: float=TOURNAMENT['elo0'], elo1: float=TOURNAMENT['elo1'],
+               alpha: float=TOURNAMENT['alpha'], beta: float=TOURNAMENT['beta']) -> dict:
+    """Return the Elo difference, its 95% margin, and the SPRT's log-likelihood ratio and verdict, from a score.
+
+    The log-likelihood ratio is the usual normal approximation of the trinomial generalized SPRT.
+    """
+
+    games = wins + draws + losses
+    if not games:
+        return {'elo': 0.0, 'margin': 0.0, 'llr': 0.0, 'verdict': None}
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * sqrt(variance / games)
+    bounds = elo(score - margin), elo(score + margin)
+    score0, score1 = expected(elo0), expected(elo1)
+    llr = games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance) if variance else 0.0
+    lower, upper = log(beta / (1 - alpha)), log((1 - beta) / alpha)
+    verdict = 'H1' if llr >= upper else 'H0' if llr <= lower else None  # H1: elo1 is more likely than elo0
+    return {'elo': elo(score), 'margin': (bounds[1] - bounds[0]) / 2, 'llr': llr, 'verdict': verdict}
+
+
+def tournament(first: tuple[str, dict], second: tuple[str, dict], games: int=TOURNAMENT['games'],
+               clock: tuple[float, float]=(TOURNAMENT['seconds'], TOURNAMENT['increment']), nodes: int=None,
+               suite: str=None, workers: int=None, sprt: bool=True) -> object:
+    """Play games between two engine configurations across worker processes, yielding each as it finishes.
+
+    Each opening is played twice, with the colors reversed. Yields (PGN, wins, draws, losses, statistics)
+    from the first configuration's view, and stops early once the SPRT reaches a verdict.
+    """
+
+    workers = workers or cpu_count() or 1
+    scores = [0, 0, 0]  # Wins, draws, losses of the first configuration
+    pending = {}
+    starts = ((fen, i) for fen in openings(suite, games) for i in range(2))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit() -> None:
+            """Start the next game, if there is one."""
+
+            if len(pending) + sum(scores) < games and (start := next(starts, None)):
+                fen, reverse = start
+                number = len(pending) + sum(scores) + 1
+                order = (second, first) if reverse else (first, second)
+                future = pool.submit(match, fen, (order[0][0], order[1][0]), (order[0][1], order[1][1]),
+                                     clock, nodes, str(number))
+                pending[future] = reverse
+
+        for _ in range(workers * 2):  # Keep every worker busy, without queueing every game up front
+            submit()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                reverse = pending.pop(future)
+                result, pgn = future.result()
+                score = RESULTS[result] if not reverse else 1 - RESULTS[result]
+                scores[0 if score == 1 else 1 if score == 0.5 else 2] += 1
+                report = statistics(*scores)
+                yield pgn, *scores, report
+                if sprt and report['verdict'] is not None:
+                    for other in pending:
+                        other.cancel()
+                    return
+                submit()
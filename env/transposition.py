@@ -0,0 +1,59 @@
+from env.constants import TRANSPOSITION
+
+
+class TranspositionTable:
+    """A fixed-size table of searched positions, keyed by Zobrist key and split into buckets."""
+
+    ENTRY_BYTES = 160  # Approximate memory held by one entry and its slot
+
+    def __init__(self, megabytes: float=TRANSPOSITION['megabytes'], ways: int=TRANSPOSITION['ways'],
+                 policy: str=TRANSPOSITION['policy']) -> None:
+        """Size the table to a memory budget, and choose its bucket eviction policy."""
+
+        if policy not in ('depth', 'always'):
+            raise ValueError(f"Unknown eviction policy: {policy}.")
+        self.ways = ways
+        self.policy = policy
+        self.buckets = max(1, int(megabytes * 2 ** 20) // (self.ENTRY_BYTES * ways))
+        self.entries = [None] * (self.buckets * ways)  # (key, depth, score, bound, move)
+
+    def __len__(self) -> int:
+        """Return the number of entries stored."""
+        return sum(entry is not None for entry in self.entries)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self.entries = [None] * (self.buckets * self.ways)
+
+    def probe(self, key: int) -> tuple | None:
+        """Return the entry stored for a key, if any."""
+
+        start = key % self.buckets * self.ways
+        for entry in self.entries[start:start + self.ways]:
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: str, move: tuple | None) -> bool:
+        """Store a searched position's depth, score, bound type (exact, lower or upper), and best move.
+
+        Return whether or not it evicted another position's entry.
+        """
+
+        entry = (key, depth, score, bound, move)
+        start = key % self.buckets * self.ways
+        bucket = self.entries[start:start + self.ways]
+        for i, occupant in enumerate(bucket):
+            if occupant is None or occupant[0] == key:  # Empty slot, or the same position
+                if occupant is not None and move is None:  # Keep a known best move
+                    entry = (key, depth, score, bound, occupant[4])
+                self.entries[start + i] = entry
+                return False
+        if self.policy == 'depth':  # Evict the shallowest entry, unless it is deeper
+            i = min(range(self.ways), key=lambda i: bucket[i][1])
+            if bucket[i][1] <= depth:
+                self.entries[start + i] = entry
+                return True
+            return False
+        self.entries[start:start + self.ways] = [entry] + bucket[:-1]  # Evict the oldest entry
+        return True
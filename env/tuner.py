@@ -0,0 +1,201 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from env.chessboard import ChessBoard
+from env.constants import LETTERS, TUNER
+from env.evaluation import PAWN_TERMS, PHASES, PIECE_SQUARES, TABLES, pawn_counts
+from env.notation import START, read_pgn
+from itertools import islice
+from math import log
+from os import cpu_count
+from numpy import array, bincount, concatenate, empty, float64, full, int8, int16, savez, sqrt, stack, zeros
+from numpy.random import default_rng
+from re import search
+
+WIDTH = 8
+NAMES = tuple(PIECE_SQUARES)  # Order of the chesspiece types in the tuned tables
+PAWN_SLOTS = 2 + WIDTH  # Doubled, isolated, then passed pawns by rank advanced
+TERMS = len(NAMES) * WIDTH ** 2 + PAWN_SLOTS  # Weights of each phase, piece-square ones first
+SLOTS = 32 + PAWN_SLOTS  # Features a position can have: one per chesspiece, then the pawn-structure counts
+PIECES = {letter: name for name, letter in LETTERS.items()}
+SCORES = {'1-0': 1.0, '1/2-1/2': 0.5, '0-1': 0.0}  # Result of a game, for white
+
+
+def extract(rows: list[tuple[str, float]]) -> tuple:
+    """Extract the features of labeled positions, given as (FEN, result for white) rows, into arrays.
+
+    Each position has SLOTS (index, coefficient) features, from white's view: +1 for each of white's
+    chesspieces on its square, -1 for each of black's on the mirrored square, and the signed pawn-structure
+    counts. Unused slots point past the last weight with a coefficient of 0. Also return each position's
+    middlegame share of the blend, and its result.
+    """
+
+    indices = full((len(rows), SLOTS), TERMS, dtype=int16)
+    coefficients = zeros((len(rows), SLOTS), dtype=int8)
+    phases = empty(len(rows))
+    for row, (fen, _) in enumerate(rows):
+        bitboards = {team: dict.fromkeys(NAMES, 0) for team in ('white', 'black')}
+        slot = phase = 0
+        for rank, text in enumerate(fen.split(maxsplit=1)[0].split('/')):
+            file = 0
+            for char in text:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                team, name = 'white' if char.isupper() else 'black', PIECES[char.lower()]
+                square = (WIDTH - 1 - rank) * WIDTH + file
+                bitboards[team][name] |= 1 << square
+                own = square if team == 'white' else square ^ (WIDTH - 1) * WIDTH  # Mirrored for black
+                indices[row, slot] = NAMES.index(name) * WIDTH ** 2 + own
+                coefficients[row, slot] = 1 if team == 'white' else -1
+                phase += PHASES[name]
+                slot, file = slot + 1, file + 1
+        indices[row, 32:] = range(TERMS - PAWN_SLOTS, TERMS)
+        coefficients[row, 32:] = pawn_counts(bitboards)
+        phases[row] = min(phase, 24) / 24
+    return indices, coefficients, phases, array([result for _, result in rows], dtype=float64)
+
+
+def label(line: str) -> tuple[str, float] | None:
+    """Read the FEN and result of an EPD line, from a `c9` or `result` operation, if it has one."""
+
+    if (found := search(r'\b(?:c9|result)\s+"?(1-0|0-1|1/2-1/2)', line)) is None:
+        return None
+    return ' '.join(line.split(maxsplit=4)[:4]), SCORES[found.group(1)]
+
+
+def replay(tags: dict[str, str], moves: list[str]) -> list[tuple[str, float]]:
+    """Label each position before a move of a PGN game with the game's result, if it has one."""
+
+    if (result := SCORES.get(tags.get('Result'))) is None:
+        return []
+    try: board, rows = ChessBoard(fen=tags.get('FEN', START)), []
+    except ValueError: return []  # A game from an unreadable position is skipped
+    for san in moves:
+        rows.append((board.fen(), result))
+        try: board.make_move(board.santomove(san))
+        except ValueError: break  # The rest of an unreadable game is skipped
+    return rows
+
+
+def _extract(items: list, pgn: bool) -> tuple:
+    """Label then extract a chunk of EPD lines, or PGN games, in a worker process."""
+
+    rows = [row for game in items for row in replay(*game)] if pgn \
+        else [row for line in items if (row := label(line)) is not None]
+    return extract(rows)
+
+
+def chunks(path: str, size: int) -> object:
+    """Lazily yield lists of `size` lines of an EPD file, or `size` games of a PGN file."""
+
+    if path.lower().endswith('.pgn'):
+        games = read_pgn(path)
+        while chunk := list(islice(games, size)):
+            yield chunk
+        return
+    with open(path) as lines:
+        while chunk := list(islice(lines, size)):
+            yield chunk
+
+
+def dataset(path: str, chunk: int=TUNER['chunk'], workers: int=TUNER['workers']) -> tuple:
+    """Stream the labeled positions of an EPD or PGN file to worker processes, and gather their features.
+
+    Only a couple of chunks per worker are in flight at once, so the file is never held whole as text.
+    """
+
+    workers, pgn, parts = workers or cpu_count() or 1, path.lower().endswith('.pgn'), []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending, items = set(), chunks(path, chunk)
+        while True:
+            while len(pending) < 2 * workers and (part := next(items, None)) is not None:
+                pending.add(pool.submit(_extract, part, pgn))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            parts.extend(future.result() for future in done)
+    if not parts or not sum(len(part[3]) for part in parts):
+        raise ValueError(f"No labeled positions in {path}.")
+    return tuple(concatenate(arrays) for arrays in zip(*parts))
+
+
+def initial() -> tuple:
+    """Return the engine's current middlegame and endgame weights, each ending with a zero weight for unused slots."""
+
+    weights = zeros((2, TERMS + 1))
+    for i, name in enumerate(NAMES):
+        weights[:, i * WIDTH ** 2:(i + 1) * WIDTH ** 2] = array(TABLES['white'][name]).T
+    weights[:, TERMS - PAWN_SLOTS:TERMS] = array(
+        [PAWN_TERMS['doubled'], PAWN_TERMS['isolated'], *PAWN_TERMS['passed']]).T
+    return weights[0], weights[1]
+
+
+def evaluate(features: tuple, middlegame: object, endgame: object) -> object:
+    """Evaluate every position at once, in centipawns for white, as the engine would."""
+
+    indices, coefficients, phases, _ = features
+    return ((middlegame[indices] * coefficients).sum(axis=1) * phases
+            + (endgame[indices] * coefficients).sum(axis=1) * (1 - phases))
+
+
+def error(scores: object, results: object, scale: float) -> float:
+    """Return the mean squared difference between results and the win probabilities predicted from scores."""
+    return float(((results - 1 / (1 + 10 ** (-scale * scores / 400))) ** 2).mean())
+
+
+def fit_scale(features: tuple, middlegame: object, endgame: object) -> float:
+    """Find the sigmoid scale that best maps the current evaluations to results, by golden-section search."""
+
+    scores, results = evaluate(features, middlegame, endgame), features[3]
+    low, high, ratio = 0.1, 3.0, (sqrt(5) - 1) / 2
+    for _ in range(40):
+        left, right = high - ratio * (high - low), low + ratio * (high - low)
+        if error(scores, results, left) < error(scores, results, right):
+            high = right
+        else: low = left
+    return (low + high) / 2
+
+
+def tune(features: tuple, epochs: int=TUNER['epochs'], rate: float=TUNER['rate'], batch: int=TUNER['batch'],
+         scale: float=TUNER['scale'], report: object=None, seed: int=0) -> tuple:
+    """Fit the evaluation weights to the results of positions, by Adam gradient descent on mini-batches.
+
+    Each step evaluates a whole mini-batch with gathers over its feature slots, and accumulates the
+    gradient of every weight with one weighted count over them. Return the middlegame and endgame weights,
+    and the sigmoid scale. If given, `report(epoch, error)` is called after each epoch.
+    """
+
+    indices, coefficients, phases, results = features
+    middlegame, endgame = initial()
+    scale = scale or fit_scale(features, middlegame, endgame)
+    weights = stack([middlegame, endgame])
+    moment, second = zeros(weights.shape), zeros(weights.shape)
+    slope = scale * log(10) / 400  # Of the sigmoid's exponent
+    random, step = default_rng(seed), 0
+    for epoch in range(1, epochs + 1):
+        order = random.permutation(len(results))
+        for start in range(0, len(order), batch):
+            rows = order[start:start + batch]
+            index, coefficient, phase = indices[rows], coefficients[rows], phases[rows]
+            scores = ((weights[0][index] * coefficient).sum(axis=1) * phase
+                      + (weights[1][index] * coefficient).sum(axis=1) * (1 - phase))
+            predicted = 1 / (1 + 10 ** (-scale * scores / 400))
+            delta = -2 * (results[rows] - predicted) * predicted * (1 - predicted) * slope / len(rows)
+            gradient = stack([bincount(index.ravel(), (coefficient * (delta * share)[:, None]).ravel(), TERMS + 1)
+                              for share in (phase, 1 - phase)])
+            gradient[:, TERMS] = 0  # Unused slots stay zero
+            step += 1
+            moment = 0.9 * moment + 0.1 * gradient
+            second = 0.999 * second + 0.001 * gradient ** 2
+            weights -= rate * (moment / (1 - 0.9 ** step)) / (sqrt(second / (1 - 0.999 ** step)) + 1e-12)
+        if report is not None:
+            report(epoch, error(evaluate(features, *weights), results, scale))
+    return weights[0], weights[1], scale
+
+
+def save(path: str, middlegame: object, endgame: object) -> None:
+    """Write weights, rounded to centipawns, in the layout the engine loads at startup."""
+
+    tables = len(NAMES) * WIDTH ** 2
+    savez(path, middlegame=middlegame[:tables].reshape(len(NAMES), WIDTH ** 2).round().astype(int),
+          endgame=endgame[:tables].reshape(len(NAMES), WIDTH ** 2).round().astype(int),
+          pawns=stack([middlegame[tables:TERMS], endgame[tables:TERMS]], axis=1).round().astype(int))
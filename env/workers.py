@@ -0,0 +1,35 @@
+from env.chessboard import ChessBoard
+from env.constants import SEARCH, STATE
+from env.game import Game
+from env.players import Computer, Player
+from time import monotonic
+
+_worker = {}  # The computer and game of a pool process
+
+
+def initialize(megabytes: float, bounds: object=None) -> None:
+    """Give a pool process its own computer, whose table persists between searches, and any shared root bounds."""
+
+    _worker['computer'] = computer = Computer(megabytes=megabytes)
+    computer.bounds = bounds  # Best root value of each depth, found by any process searching the same root
+    _worker['game'] = Game(p2=computer, ponder=False)
+
+
+def search(fen: str, depth: int=SEARCH['depth'], seconds: float=SEARCH['seconds'], nodes: int=None,
+           moves: list=None) -> tuple:
+    """Search a position, or only some of its root moves, in a pool process.
+
+    Return the best move's text, if any, the (depth, value, move, exact) result of each completed depth,
+    where a result that only failed low against another process's bound is not exact, the nodes searched,
+    and the seconds taken.
+    """
+
+    computer, game = _worker['computer'], _worker['game']
+    board = ChessBoard(fen=fen)
+    computer.team = board.turn
+    start = monotonic()
+    move = computer.ab_search(game, STATE(board, computer, Player(near=board.turn != 'white'), depth), 0,
+                              seconds=seconds, nodes=nodes, moves=moves)
+    results = [(horizon, value, action, horizon not in computer.fail_lows)
+               for horizon, value, action in computer.results]
+    return None if move is None else board.movetotext(move), results, computer.nodes, monotonic() - start
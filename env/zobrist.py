@@ -0,0 +1,31 @@
+from env.constants import META
+from env.pieces import PIECES
+from random import Random
+
+SEED = 0x5EED  # Fixed, so that keys agree across processes and runs
+
+_random = Random(SEED)
+_bits = lambda: _random.getrandbits(64)
+
+KEYS = {  # Random 64-bit keys for every feature of a position
+    'pieces': {  # One key per team, piece type, and square
+        team: {piece.__name__: [_bits() for _ in range(META['width'] ** 2)] for piece in PIECES}
+        for team in META['teams']},
+    'turn': _bits(),  # Black to move
+    'castling': [_bits() for _ in range(16)],  # One key per set of castling rights
+    'en_passant': [_bits() for _ in range(META['width'])]}  # One key per file
+
+
+def zobrist(board: object) -> int:
+    """Compute a board's Zobrist key from scratch."""
+
+    key = 0
+    for square, piece in enumerate(board.squares):
+        if piece is not None:
+            key ^= KEYS['pieces'][piece.team][piece.name][square]
+    if board.turn == 'black':
+        key ^= KEYS['turn']
+    key ^= KEYS['castling'][board.castling]
+    if board.en_passant is not None:
+        key ^= KEYS['en_passant'][board.en_passant % META['width']]
+    return key
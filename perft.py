@@ -0,0 +1,135 @@
+from argparse import ArgumentParser
+from cProfile import Profile
+from env.chessboard import ChessBoard
+from env.constants import STATE
+from env.game import Game
+from env.notation import START
+from env.players import Computer, Player
+from env.statistics import Sampler, SearchStatistics
+from time import perf_counter
+
+REFERENCES = {  # Standard perft positions, with their leaf counts at depth 1, 2, ...
+    'start': (START, [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 [48, 2039, 97862, 4085603]),
+    'endgame': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                [14, 191, 2812, 43238, 674624]),
+    'promotions': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                   [6, 264, 9467, 422333]),
+    'talkchess': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                  [44, 1486, 62379, 2103487]),
+    'symmetric': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                  [46, 2079, 89890, 3894594])}
+
+BENCHMARKS = (  # Fixed search positions, from the opening to the endgame
+    START,
+    'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+
+
+def perft(board: ChessBoard, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree to a depth."""
+
+    moves = board.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board: ChessBoard, depth: int) -> dict[str, int]:
+    """Count the leaf nodes to a depth below each legal move."""
+
+    counts = {}
+    for move in board.legal_moves():
+        board.make_move(move)
+        counts[board.movetotext(move)] = perft(board, depth - 1)
+        board.unmake_move()
+    return counts
+
+
+def timed(function: object, *args) -> tuple[object, float]:
+    """Call a function, and return its result with the seconds it took."""
+
+    start = perf_counter()
+    result = function(*args)
+    return result, perf_counter() - start
+
+
+def nps(nodes: int, seconds: float) -> int:
+    """Return nodes per second."""
+    return int(nodes / seconds) if seconds > 0 else 0
+
+
+def suite(depth: int) -> bool:
+    """Check the reference positions' leaf counts up to a depth, and report their speed."""
+
+    passed = True
+    for name, (fen, counts) in REFERENCES.items():
+        plies = min(depth, len(counts))
+        nodes, seconds = timed(perft, ChessBoard(fen=fen), plies)
+        ok = nodes == counts[plies - 1]
+        passed &= ok
+        print(f"{name:<12} depth {plies}  {nodes:>9} / {counts[plies - 1]:>9}  "
+              f"{'ok ' if ok else 'BAD'}  {seconds:7.2f}s  {nps(nodes, seconds):>8} nps")
+    return passed
+
+
+def bench(depth: int, seconds: float, log: str=None, profile: str=None) -> None:
+    """Search the benchmark positions, and report nodes per second and the time taken to reach each depth.
+
+    Optionally, search statistics are logged as JSON lines, and the searches are profiled.
+    """
+
+    game, total_nodes, total_seconds = Game(), 0, 0.0
+    statistics = SearchStatistics(log) if log else None
+    profiler = Profile() if profile == 'cprofile' else Sampler() if profile == 'sampling' else None
+    for fen in BENCHMARKS:
+        board = ChessBoard(fen=fen)
+        computer = Computer(near=board.turn == 'white', seconds=seconds, statistics=statistics, profiler=profiler)
+        opponent = Player(near=board.turn != 'white')
+        move, elapsed = timed(computer.ab_search, game, STATE(board, computer, opponent, depth), 0)
+        total_nodes, total_seconds = total_nodes + computer.nodes, total_seconds + elapsed
+        depths = '  '.join(f"d{plies}:{spent:.2f}s" for plies, _, spent in computer.iterations)
+        print(f"{board.movetotext(move) if move else '-':<6} {computer.nodes:>8} nodes  "
+              f"{nps(computer.nodes, elapsed):>7} nps  {depths}")
+        if statistics is not None:
+            report = statistics.last
+            print(f"       cutoffs {report['cutoff_rate']:.1%} ({report['first_cutoff_rate']:.1%} first)  "
+                  f"table hits {report['table_hit_rate']:.1%}  overwrites {report['table_overwrite_rate']:.1%}  "
+                  f"quiescence {report['quiescence_share']:.1%}  movegen {report['movegen_seconds']:.2f}s  "
+                  f"evaluation {report['evaluation_seconds']:.2f}s")
+    print(f"Total: {total_nodes} nodes in {total_seconds:.2f}s, {nps(total_nodes, total_seconds)} nps")
+    if profile == 'cprofile':
+        profiler.print_stats('cumulative')
+    elif profile == 'sampling':
+        profiler.print_stats()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Measure move generation correctness and speed, and search speed.")
+    parser.add_argument('mode', choices=('perft', 'divide', 'suite', 'bench'))
+    parser.add_argument('depth', type=int, nargs='?', default=4)
+    parser.add_argument('--fen', default=START, help="position to count from (perft and divide)")
+    parser.add_argument('--seconds', type=float, default=60.0, help="time budget per position (bench)")
+    parser.add_argument('--statistics', metavar='LOG', help="log search statistics as JSON lines (bench)")
+    parser.add_argument('--profile', choices=('cprofile', 'sampling'), help="profile the searches (bench)")
+    args = parser.parse_args()
+    if args.mode == 'perft':
+        nodes, seconds = timed(perft, ChessBoard(fen=args.fen), args.depth)
+        print(f"{nodes} nodes in {seconds:.2f}s, {nps(nodes, seconds)} nps")
+    elif args.mode == 'divide':
+        counts, seconds = timed(divide, ChessBoard(fen=args.fen), args.depth)
+        for move, nodes in sorted(counts.items()):
+            print(f"{move}: {nodes}")
+        print(f"{len(counts)} moves, {sum(counts.values())} nodes in {seconds:.2f}s")
+    elif args.mode == 'suite':
+        raise SystemExit(0 if suite(args.depth) else 1)
+    else: bench(args.depth, args.seconds, args.statistics, args.profile)
@@ -0,0 +1,77 @@
+from argparse import ArgumentParser
+from asyncio import Event, gather, open_connection, run, sleep
+from env.chessboard import ChessBoard
+from env.constants import SERVER
+from env.server import GameServer, percentile
+from random import Random
+from time import perf_counter
+
+
+async def serve(host: str, port: int, workers: int, nodes: int) -> None:
+    """Serve games until interrupted."""
+
+    server = GameServer(workers=workers, nodes=nodes)
+    port = await server.start(host, port)
+    print(f"Serving on {host}:{port} with {server.workers} search processes.")
+    try: await Event().wait()
+    finally: await server.close()
+
+
+async def client(host: str, port: int, moves: int, think: float, seed: int, latencies: list[float]) -> int:
+    """Play random moves in one game over its own connection, recording how long each reply takes.
+
+    Before each move, the client thinks for a random time, averaging `think` seconds.
+    """
+
+    reader, writer = await open_connection(host, port)
+    random = Random(seed)
+    writer.write(b"new color white\n")
+    _, id, *fen = (await reader.readline()).decode().split()
+    board, played = ChessBoard(fen=' '.join(fen)), 0
+    while played < moves and board.legal_moves():
+        await sleep(random.uniform(0, 2 * think))
+        move = random.choice(board.legal_moves())
+        board.make_move(move)
+        start = perf_counter()
+        writer.write(f"move {id} {board.movetotext(move)}\n".encode())
+        while (reply := (await reader.readline()).decode().split())[0] not in ('move', 'result', 'error'):
+            continue
+        if reply[0] != 'move':
+            break
+        latencies.append(perf_counter() - start)
+        board.make_move(board.texttomove(reply[2]))
+        played += 1
+    writer.write(b"quit\n")
+    writer.close()
+    return played
+
+
+async def load(sessions: int, moves: int, think: float, workers: int, nodes: int) -> None:
+    """Play many concurrent random games against a server on localhost, and report reply latencies."""
+
+    server = GameServer(workers=workers, nodes=nodes)
+    port = await server.start(SERVER['host'], 0)
+    latencies, start = [], perf_counter()
+    played = await gather(*(client(SERVER['host'], port, moves, think, seed, latencies)
+                            for seed in range(sessions)))
+    elapsed = perf_counter() - start
+    await server.close()
+    print(f"{sessions} sessions, {sum(played)} replies in {elapsed:.2f}s ({sum(played) / elapsed:.1f}/s)  "
+          + '  '.join(f"p{round(fraction * 100)} {percentile(latencies, fraction) * 1000:.0f} ms"
+                      for fraction in (0.5, 0.9, 0.99)))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Serve games against the computer over a local socket, or load test it.")
+    parser.add_argument('mode', choices=('serve', 'load'))
+    parser.add_argument('--host', default=SERVER['host'])
+    parser.add_argument('--port', type=int, default=SERVER['port'])
+    parser.add_argument('--workers', type=int, default=SERVER['workers'], help="search processes")
+    parser.add_argument('--nodes', type=int, help="node budget per search, instead of each game's clock")
+    parser.add_argument('--sessions', type=int, default=100, help="concurrent games (load)")
+    parser.add_argument('--moves', type=int, default=10, help="moves played in each game (load)")
+    parser.add_argument('--think', type=float, default=1.0, help="average seconds before each move (load)")
+    args = parser.parse_args()
+    if args.mode == 'serve':
+        run(serve(args.host, args.port, args.workers, args.nodes))
+    else: run(load(args.sessions, args.moves, args.think, args.workers, args.nodes))
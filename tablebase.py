@@ -0,0 +1,27 @@
+from argparse import ArgumentParser
+from env.chessboard import ChessBoard
+from env.constants import TABLEBASE
+from env.tablebase import Tablebases, generate
+from time import perf_counter
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Generate endgame tablebases, or probe a position.")
+    parser.add_argument('mode', choices=('generate', 'probe'))
+    parser.add_argument('signatures', nargs='*', default=TABLEBASE['signatures'], help="endings (generate)")
+    parser.add_argument('--directory', default=TABLEBASE['directory'], help="directory of the tablebase files")
+    parser.add_argument('--workers', type=int, default=TABLEBASE['workers'], help="worker processes (generate)")
+    parser.add_argument('--fen', help="position to probe (probe)")
+    args = parser.parse_args()
+    if args.mode == 'generate':
+        for signature in args.signatures:  # Smaller endings first, as promotions and captures lead into them
+            start = perf_counter()
+            file_path = generate(signature, args.directory, args.workers)
+            print(f"{signature}: {file_path} in {perf_counter() - start:.1f}s")
+    else:
+        if args.fen is None:
+            parser.error("probe needs --fen")
+        if (solved := Tablebases(args.directory).probe(ChessBoard(fen=args.fen))) is None:
+            print("Not solved.")
+        else:
+            result, plies = solved
+            print("Draw." if not result else f"{'Win' if result > 0 else 'Loss'} in {plies} plies.")
@@ -0,0 +1,42 @@
+from argparse import ArgumentParser
+from ast import literal_eval
+from env.constants import TOURNAMENT
+from env.tournament import tournament
+from sys import stderr, stdout
+
+
+def engine(text: str) -> tuple[str, dict]:
+    """Read an engine configuration, written as `name` or `name:option=value,option=value`."""
+
+    name, _, options = text.partition(':')
+    pairs = (option.split('=', 1) for option in options.split(',') if option)
+    return name, {'megabytes': TOURNAMENT['megabytes'], **{key: literal_eval(value) for key, value in pairs}}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Play two engine configurations against each other, streaming PGN.")
+    parser.add_argument('first', type=engine, help="configuration under test, such as new:lmr=True")
+    parser.add_argument('second', type=engine, help="configuration to compare with, such as old:lmr=False")
+    parser.add_argument('--games', type=int, default=TOURNAMENT['games'])
+    parser.add_argument('--tc', default=f"{TOURNAMENT['seconds']:g}+{TOURNAMENT['increment']:g}",
+                        help="time control, as base+increment seconds")
+    parser.add_argument('--nodes', type=int, help="node budget per move, instead of the clock")
+    parser.add_argument('--openings', help="EPD or PGN opening suite, instead of random openings")
+    parser.add_argument('--workers', type=int, help="worker processes, or one per core")
+    parser.add_argument('--no-sprt', dest='sprt', action='store_false', help="play every game")
+    parser.add_argument('--pgn', help="file to write games to, instead of standard output")
+    args = parser.parse_args()
+    base, _, increment = args.tc.partition('+')
+    out = open(args.pgn, 'w') if args.pgn else stdout
+    try:
+        for pgn, wins, draws, losses, report in tournament(
+                args.first, args.second, args.games, (float(base), float(increment or 0)),
+                args.nodes, args.openings, args.workers, args.sprt):
+            out.write(pgn)
+            out.flush()  # Each game is available as soon as it finishes
+            print(f"{wins + draws + losses:>5} games  +{wins} ={draws} -{losses}  "
+                  f"Elo {report['elo']:+.1f} +/- {report['margin']:.1f}  LLR {report['llr']:+.2f}"
+                  + (f"  {report['verdict']} accepted" if report['verdict'] else ''), file=stderr)
+    finally:
+        if out is not stdout:
+            out.close()
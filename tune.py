@@ -0,0 +1,28 @@
+from argparse import ArgumentParser
+from env.constants import EVALUATION, TUNER
+from env.tuner import dataset, evaluate, error, initial, save, tune
+from time import perf_counter
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Tune the evaluation to the results of labeled positions.")
+    parser.add_argument('positions', help="EPD file with c9 or result operations, or PGN file of finished games")
+    parser.add_argument('--output', default=EVALUATION['weights'], help="weights file, loaded by the engine at startup")
+    parser.add_argument('--epochs', type=int, default=TUNER['epochs'])
+    parser.add_argument('--batch', type=int, default=TUNER['batch'], help="positions in each gradient step")
+    parser.add_argument('--rate', type=float, default=TUNER['rate'], help="step size, in centipawns")
+    parser.add_argument('--scale', type=float, default=TUNER['scale'], help="sigmoid scale, fitted if not given")
+    parser.add_argument('--workers', type=int, default=TUNER['workers'], help="feature extraction processes")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    features = dataset(args.positions, workers=args.workers)
+    print(f"{len(features[3])} positions extracted in {perf_counter() - start:.1f}s")
+    start = perf_counter()
+    middlegame, endgame, scale = tune(features, args.epochs, args.rate, args.batch, args.scale,
+                                      report=lambda epoch, loss: print(f"epoch {epoch}: error {loss:.6f}"))
+    before = error(evaluate(features, *initial()), features[3], scale)
+    print(f"Tuned in {perf_counter() - start:.1f}s with scale {scale:.3f}: "
+          f"error {before:.6f} -> {error(evaluate(features, middlegame, endgame), features[3], scale):.6f}")
+    save(args.output, middlegame, endgame)
+    print(f"Weights written to {args.output}")
@@ -0,0 +1,177 @@
+from env.book import Book
+from env.chessboard import ChessBoard
+from env.constants import CLOCK, SEARCH, STATE, TRANSPOSITION, UCI
+from env.game import Game
+from env.notation import START
+from env.players import Computer, Player
+from env.tablebase import Tablebases
+from env.transposition import TranspositionTable
+from math import inf
+from sys import stdin, stdout
+from threading import Event, Thread
+from time import monotonic
+
+OPTIONS = {  # Options the interface may set: (type, default, minimum, maximum)
+    'Hash': ('spin', TRANSPOSITION['megabytes'], 1, 4096),
+    'BookFile': ('string', '<empty>', None, None),
+    'TablebaseDirectory': ('string', '<empty>', None, None)}
+
+
+class Engine:
+    """A Universal Chess Interface engine, which searches in a background thread to keep answering commands."""
+
+    def __init__(self, output: object=None) -> None:
+        """Initialize the computer, the game it searches, and the position."""
+
+        self.output = output or self.write
+        self.computer = Computer()
+        self.computer.reporter = self.info
+        self.game = Game()
+        self.board = ChessBoard(fen=START)
+        self.thread = None  # Background search, if any
+        self.released = Event()  # Set once an infinite or pondering search may report its best move
+        self.budget = 0.0  # Seconds a pondering search gets once its predicted move is played
+        self.deadline = inf  # Time the pondering search must stop by, once its predicted move is played
+        self.started = 0.0
+
+    @staticmethod
+    def write(line: str) -> None:
+        """Write a line to the interface."""
+
+        stdout.write(line + '\n')
+        stdout.flush()
+
+    def handle(self, line: str) -> bool:
+        """Answer a command from the interface, and return whether or not to keep reading."""
+
+        command, *tokens = line.split() or ['']
+        if command == 'uci':
+            self.output(f"id name {UCI['name']}")
+            self.output(f"id author {UCI['author']}")
+            for name, (kind, default, minimum, maximum) in OPTIONS.items():
+                bounds = f" min {minimum} max {maximum}" if kind == 'spin' else ''
+                self.output(f"option name {name} type {kind} default {default}{bounds}")
+            self.output("uciok")
+        elif command == 'isready':
+            self.output("readyok")
+        elif command == 'setoption':
+            self.stop()
+            self.setoption(tokens)
+        elif command == 'ucinewgame':
+            self.stop()
+            self.computer.table.clear()
+            self.board = ChessBoard(fen=START)
+        elif command == 'position':
+            self.stop()
+            self.position(tokens)
+        elif command == 'go':
+            self.stop()
+            self.go(tokens)
+        elif command == 'ponderhit':  # The predicted move was played, so the clock starts
+            self.deadline = monotonic() + self.budget
+            self.computer.limit(self.deadline)  # Re-applied as iterations complete, if the search had not started
+            self.released.set()
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            return False
+        return True
+
+    def setoption(self, tokens: list[str]) -> None:
+        """Set an option, given as `name <name> value <value>`."""
+
+        text = ' '.join(tokens)
+        name, _, value = text.removeprefix('name ').partition(' value ')
+        if name == 'Hash':
+            self.computer.table = TranspositionTable(megabytes=int(value))
+        elif name == 'BookFile':
+            self.computer.book = None if value in ('', '<empty>') else Book(value)
+        elif name == 'TablebaseDirectory':
+            self.computer.tablebases = None if value in ('', '<empty>') else Tablebases(value)
+
+    def position(self, tokens: list[str]) -> None:
+        """Set up a position, given as `startpos` or `fen <fen>`, then `moves <move> ...`.
+
+        An unreadable FEN leaves the last position, and the moves stop at the first unreadable or illegal one.
+        """
+
+        moves = tokens.index('moves') if 'moves' in tokens else len(tokens)
+        fen = START if tokens[:1] == ['startpos'] else ' '.join(tokens[1:moves])
+        try: self.board = ChessBoard(fen=fen)
+        except ValueError: return
+        for text in tokens[moves + 1:]:
+            try: move = self.board.texttomove(text)
+            except ValueError: break
+            if move not in self.board.legal_moves():
+                break
+            self.board.make_move(move)
+
+    def go(self, tokens: list[str]) -> None:
+        """Start a background search, within the limits given as `wtime`, `btime`, `movetime`, `depth`, and so on."""
+
+        limits = {key: int(value) for key, value in zip(tokens, tokens[1:]) if value.lstrip('-').isdigit()}
+        infinite = 'infinite' in tokens
+        if infinite:
+            seconds = inf
+        elif 'movetime' in limits:
+            seconds = max(0.0, limits['movetime'] / 1000 - CLOCK['overhead'])
+        elif (side := 'w' if self.board.turn == 'white' else 'b') + 'time' in limits:
+            seconds = Computer.budget(limits[side + 'time'] / 1000, limits.get(side + 'inc', 0) / 1000,
+                                      limits.get('movestogo'))
+        else: seconds = inf if 'depth' in limits or 'nodes' in limits else self.computer.seconds
+        depth = min(limits.get('depth', SEARCH['depth']), SEARCH['depth'])
+        self.released.clear()
+        self.deadline = inf
+        if 'ponder' in tokens:  # Search on the opponent's time, until `ponderhit` or `stop`
+            self.budget, seconds = seconds, inf
+        elif not infinite:
+            self.released.set()
+        self.thread = Thread(target=self.search, args=(self.board, depth, seconds, limits.get('nodes')), daemon=True)
+        self.thread.start()
+
+    def search(self, board: ChessBoard, depth: int, seconds: float, nodes: int | None) -> None:
+        """Search a board, then report its best move, and the reply expected to it."""
+
+        self.computer.team = board.turn
+        self.started = monotonic()
+        state = STATE(board, self.computer, Player(near=board.turn != 'white'), depth)
+        move = self.computer.ab_search(self.game, state, 0, seconds=seconds, nodes=nodes)
+        self.released.wait()  # An infinite or pondering search reports only once stopped or hit
+        if move is None:
+            self.output("bestmove 0000")
+            return
+        line = self.computer.line
+        ponder = f" ponder {board.movetotext(line[1])}" if len(line) > 1 and line[0] == move else ''
+        self.output(f"bestmove {board.movetotext(move)}{ponder}")
+
+    def stop(self) -> None:
+        """Stop the background search, if any, and wait for its best move."""
+
+        while self.thread is not None and self.thread.is_alive():
+            self.released.set()
+            self.computer.stop()
+            self.thread.join(SEARCH['interval'] / 1000)
+        self.thread = None
+
+    def info(self, computer: Computer) -> None:
+        """Report a completed iteration of the search."""
+
+        if self.deadline < computer.deadline:  # A ponderhit came before the search set its own deadline
+            computer.limit(self.deadline)
+        depth, value, _ = computer.results[-1]
+        elapsed = monotonic() - self.started
+        if abs(value) >= SEARCH['mate'] - 2 * SEARCH['depth']:  # Moves to mate, negative when mated
+            score = f"mate {(SEARCH['mate'] - abs(value)) // 2 * (1 if value > 0 else -1)}"
+        else: score = f"cp {int(value)}"
+        pv = ' '.join(ChessBoard.movetotext(move) for move in computer.line)
+        self.output(f"info depth {depth} score {score} nodes {computer.nodes} "
+                    f"nps {int(computer.nodes / elapsed) if elapsed > 0 else 0} time {int(elapsed * 1000)} pv {pv}")
+
+
+if __name__ == '__main__':
+    engine = Engine()
+    for command in stdin:
+        if not engine.handle(command):
+            break
+    engine.stop()